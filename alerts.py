@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from glucose_data import GlucoseSeries, is_high, is_low
+
+ALERT_LOW = "low"
+ALERT_HIGH = "high"
+ALERT_PREDICTED_LOW = "predicted_low"
+
+
+class Alert(NamedTuple):
+    kind: str
+    title: str
+    message: str
+
+
+class AlertEngine:
+    """
+    Evaluates the live series against the configured thresholds.
+
+    Each alert kind is a latched state: it fires when its condition is entered,
+    repeats at most once per quiet period while the condition holds, and only
+    re-arms after the value moves back past the threshold by `hysteresis`
+    mg/dL, so readings hovering around a threshold do not flap.
+    """
+
+    # Readings older than this are not alerted on (sensor warm-up, lost signal)
+    STALE_AFTER = 20 * 60
+
+    def __init__(self, config):
+        self.config = config
+        self._active: Dict[str, bool] = {}
+        self._last_fired: Dict[str, float] = {}
+        self._snoozed_until = 0.0
+
+    @property
+    def hysteresis(self) -> float:
+        return float(getattr(self.config, "alert_hysteresis", 10))
+
+    @property
+    def quiet_period(self) -> float:
+        return float(getattr(self.config, "alert_quiet_minutes", 30)) * 60
+
+    @property
+    def horizon_minutes(self) -> float:
+        return float(getattr(self.config, "predict_low_minutes", 20))
+
+    def snooze(self, seconds: float, now: Optional[float] = None) -> None:
+        self._snoozed_until = (now or time.time()) + seconds
+
+    def reset(self) -> None:
+        self._active.clear()
+        self._last_fired.clear()
+
+    def evaluate(self, series: GlucoseSeries, now: Optional[float] = None) -> List[Alert]:
+        now = now or time.time()
+        latest = series.latest
+        if not latest or not latest.value or now - latest.timestamp > self.STALE_AFTER:
+            return []
+
+        val = int(round(latest.value))
+        low = self.config.low_threshold
+        high = self.config.high_threshold
+        h = self.hysteresis
+
+        candidates = []
+        low_active = self._latch(ALERT_LOW, is_low(val, low), val > low + h)
+        if low_active:
+            candidates.append(Alert(ALERT_LOW, "CRITICAL LOW", f"{val} mg/dL"))
+
+        if self._latch(ALERT_HIGH, is_high(val, high), val < high - h):
+            candidates.append(Alert(ALERT_HIGH, "HIGH ALERT", f"{val} mg/dL"))
+
+        # Project the current rate of change forward to warn before the low threshold is crossed
+        rate = series.rate_of_change()
+        projected = None
+        if rate is not None and rate < 0:
+            projected = latest.value + rate * self.horizon_minutes
+        predicted = not low_active and projected is not None and is_low(projected, low)
+        recovered = low_active or projected is None or projected > low + h
+        if self._latch(ALERT_PREDICTED_LOW, predicted, recovered):
+            candidates.append(Alert(ALERT_PREDICTED_LOW, "LOW PREDICTED",
+                                    f"{val} mg/dL, falling {abs(rate):.1f} mg/dL/min; "
+                                    f"~{int(projected)} in {int(self.horizon_minutes)} min"))
+
+        if now < self._snoozed_until:
+            return []
+        return [a for a in candidates if self._due(a.kind, now)]
+
+    def _latch(self, kind: str, enter: bool, leave: bool) -> bool:
+        active = self._active.get(kind, False)
+        if not active and enter:
+            active = True
+            self._last_fired.pop(kind, None)
+        elif active and leave:
+            active = False
+        self._active[kind] = active
+        return active
+
+    def _due(self, kind: str, now: float) -> bool:
+        last = self._last_fired.get(kind)
+        if last is not None and now - last < self.quiet_period:
+            return False
+        self._last_fired[kind] = now
+        return True
+
+
+class NotificationDispatcher:
+    """
+    Delivers notifications from a dedicated worker thread so a slow
+    notification backend never blocks the polling thread.
+    """
+
+    def __init__(self, app_name: str = "LibreView", maxsize: int = 16):
+        self.app_name = app_name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def post(self, alert: Alert) -> bool:
+        try:
+            self._queue.put_nowait(alert)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        from plyer import notification
+
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                break
+            try:
+                notification.notify(title=alert.title, message=alert.message, app_name=self.app_name)
+            except Exception as e:
+                print(f"Notification failed: {e}")
@@ -1,22 +1,197 @@
 import requests
 import hashlib
-import json
 import os
+import threading
 import time
-from typing import Optional, Dict, List, Any
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Dict, Any
+
+from glucose_data import GlucoseData, GlucoseSeries, GraphColumns, decode_graph, decode_graph_response, loads
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated transport failures or 5xx responses.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected without touching the network. Once `reset_timeout` has passed
+    a single probe request is let through (half-open): success closes the
+    circuit, failure re-opens it with the timeout doubled up to `max_timeout`.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60, max_timeout: float = 15 * 60):
+        self.failure_threshold = failure_threshold
+        self.base_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError("LibreView API unavailable; circuit breaker is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._timeout = self.base_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                self._timeout = min(self._timeout * 2, self.max_timeout)
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def describe(self) -> str:
+        state = self.state
+        if state == self.OPEN:
+            return f"API unavailable, retrying in {int(self.retry_in())}s"
+        if state == self.HALF_OPEN:
+            return "API unavailable, probing for recovery"
+        return ""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, later callers block until it finishes and share its result.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
 
 class LibreViewAPI:
     DEFAULT_API_VERSION = "4.16.0"
+    # (connect, read) timeout for a single HTTP request
+    REQUEST_TIMEOUT = (5, 15)
+    # Overall budget for one login or fetch, including retries and redirects
+    CALL_DEADLINE = 30
+    # Bound on minimumVersion / region redirect round-trips within one call
+    MAX_REDIRECTS = 3
+    # Extra attempts for idempotent GETs on transport errors and 5xx
+    MAX_RETRIES = 1
+    # The sensor reports once a minute, so /graph responses are reused for that long
+    GRAPH_TTL = 60
+    CONNECTIONS_TTL = 300
+    # LibreLinkUp regional deployments, raced when the account's region is unknown
+    KNOWN_REGIONS = ("us", "eu", "eu2", "de", "fr", "jp", "ap", "au", "ae", "ca", "la", "ru")
+    # Points every endpoint at a stand-in server (regions become path prefixes)
+    API_URL_ENV = "LIBREVIEW_API_URL"
     
-    def __init__(self, region: Optional[str] = None):
+    def __init__(self, region: Optional[str] = None, min_version: Optional[str] = None,
+                 api_url: Optional[str] = None):
+        # None: unknown; "": the global endpoint serves this account
         self.region = region
+        self.api_url = (api_url or os.environ.get(self.API_URL_ENV) or "").rstrip("/") or None
         self.base_url = self._build_api_url(region)
         self.token = None
         self.account_id_hash = None
         self.patient_id = None
-        self.min_version = self.DEFAULT_API_VERSION
+        self.min_version = min_version or self.DEFAULT_API_VERSION
+        self.breaker = CircuitBreaker()
+        self._flight = SingleFlight()
+        self._cache = TTLCache()
+        # Serializes merges into a shared series when callers were coalesced
+        self._merge_lock = threading.Lock()
         
     def _build_api_url(self, region: Optional[str]) -> str:
+        if self.api_url:
+            return f"{self.api_url}/{region}" if region else self.api_url
         if region:
             return f"https://api-{region}.libreview.io"
         return "https://api.libreview.io"
@@ -34,53 +209,170 @@ class LibreViewAPI:
     def _sha256(self, message: str) -> str:
         return hashlib.sha256(message.encode()).hexdigest()
 
+    def _request(self, method: str, url: str, deadline: float, retries: int = 0, **kwargs) -> requests.Response:
+        """Send one request through the circuit breaker, bounded by the call deadline."""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"Deadline exceeded for {url}")
+            connect, read = self.REQUEST_TIMEOUT
+            timeout = (min(connect, remaining), min(read, remaining))
+
+            self.breaker.before_call()
+            try:
+                response = requests.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    return response
+            attempt += 1
+            time.sleep(min(2 ** attempt, max(0.0, deadline - time.monotonic())))
+
+    def _min_version_from(self, response: requests.Response) -> Optional[str]:
+        if response.status_code != 403:
+            return None
+        try:
+            data = loads(response.content)
+        except Exception:
+            return None
+        if "data" in data and "minimumVersion" in (data["data"] or {}):
+            return data["data"]["minimumVersion"]
+        return None
+
     def login(self, email: str, password: str) -> bool:
-        url = f"{self.base_url}/llu/auth/login"
+        # Concurrent logins for the same account share one round-trip
+        return self._flight.do(("login", email), lambda: self._login(email, password))
+
+    def _login(self, email: str, password: str) -> bool:
+        self._cache.clear()
         payload = {"email": email, "password": password}
+        deadline = time.monotonic() + self.CALL_DEADLINE
         
         try:
-            response = requests.post(url, json=payload, headers=self.get_headers())
-            
-            if response.status_code == 403:
-                data = response.json()
-                if "data" in data and "minimumVersion" in data["data"]:
-                    self.min_version = data["data"]["minimumVersion"]
+            if self.region is None:
+                login_data = self._discover_region(payload, deadline)
+                if login_data is not None:
+                    return self._complete_login(login_data, deadline)
+
+            # Each iteration follows at most one version bump or region redirect
+            for _ in range(self.MAX_REDIRECTS + 1):
+                url = f"{self.base_url}/llu/auth/login"
+                response = self._request("POST", url, deadline, json=payload, headers=self.get_headers())
+                
+                min_version = self._min_version_from(response)
+                if min_version and min_version != self.min_version:
+                    self.min_version = min_version
                     print(f"Updating API version to {self.min_version}")
-                    return self.login(email, password)
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            login_data = data.get("data", {})
-            if data.get("status") == 0 and login_data.get("redirect") and login_data.get("region"):
-                self.region = login_data["region"]
-                self.base_url = self._build_api_url(self.region)
-                print(f"Redirecting to region {self.region} at {self.base_url}")
-                return self.login(email, password)
-            
-            self.token = login_data.get("authTicket", {}).get("token")
-            account_id = login_data.get("user", {}).get("id")
-            
-            if not self.token or not account_id:
-                return False
+                    continue
                 
-            self.account_id_hash = self._sha256(account_id)
-            return self._fetch_connections()
+                response.raise_for_status()
+                data = loads(response.content)
+                
+                login_data = data.get("data", {})
+                if data.get("status") == 0 and login_data.get("redirect") and login_data.get("region"):
+                    self.region = login_data["region"]
+                    self.base_url = self._build_api_url(self.region)
+                    print(f"Redirecting to region {self.region} at {self.base_url}")
+                    continue
+                
+                if self.region is None:
+                    self.region = ""
+                return self._complete_login(login_data, deadline)
+
+            print("Login failed: too many version/region redirects")
+            return False
             
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                 data = e.response.json()
-                 if "data" in data and "minimumVersion" in data["data"]:
-                    self.min_version = data["data"]["minimumVersion"]
-                    print(f"Updating API version to {self.min_version} after error")
-                    return self.login(email, password)
             print(f"Login failed: {e}")
             return False
         except Exception as e:
             print(f"An error occurred during login: {e}")
             return False
 
-    def _fetch_connections(self) -> bool:
+    def _complete_login(self, login_data: Dict[str, Any], deadline: float) -> bool:
+        self.token = (login_data.get("authTicket") or {}).get("token")
+        account_id = (login_data.get("user") or {}).get("id")
+
+        if not self.token or not account_id:
+            return False
+
+        self.account_id_hash = self._sha256(account_id)
+        return self._fetch_connections(deadline)
+
+    def _discover_region(self, payload: Dict[str, str], deadline: float) -> Optional[Dict[str, Any]]:
+        """
+        Race the global and every regional login endpoint and return the first
+        response that carries an auth ticket, with region and base URL set.
+        Returns None when no endpoint issued a ticket; a region redirect or
+        version bump seen on the way is kept, so the sequential login that
+        follows needs a single round-trip.
+        """
+        endpoints = {"": self._build_api_url(None)}
+        endpoints.update((region, self._build_api_url(region)) for region in self.KNOWN_REGIONS)
+        headers = self.get_headers()
+        connect, read = self.REQUEST_TIMEOUT
+
+        def attempt(url):
+            remaining = max(0.1, deadline - time.monotonic())
+            return requests.post(f"{url}/llu/auth/login", json=payload, headers=headers,
+                                 timeout=(min(connect, remaining), min(read, remaining)))
+
+        # Unreachable regional hosts must not trip the breaker, so the race bypasses _request
+        pool = ThreadPoolExecutor(max_workers=len(endpoints), thread_name_prefix="login-race")
+        try:
+            pending = {pool.submit(attempt, url): region for region, url in endpoints.items()}
+            redirect = None
+            while pending:
+                done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    region = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except requests.exceptions.RequestException:
+                        continue
+                    min_version = self._min_version_from(response)
+                    if min_version:
+                        self.min_version = min_version
+                        continue
+                    if not response.ok:
+                        continue
+                    try:
+                        data = loads(response.content)
+                    except ValueError:
+                        # A captive portal or HTML error page; another endpoint may still answer
+                        continue
+                    if not isinstance(data, dict) or not isinstance(data.get("data") or {}, dict):
+                        continue
+                    login_data = data.get("data") or {}
+                    if data.get("status") == 0 and (login_data.get("authTicket") or {}).get("token"):
+                        self.region = region
+                        self.base_url = self._build_api_url(region)
+                        print(f"Discovered region {region or 'global'} at {self.base_url}")
+                        return login_data
+                    if login_data.get("redirect") and login_data.get("region"):
+                        redirect = login_data["region"]
+            if redirect:
+                self.region = redirect
+                self.base_url = self._build_api_url(redirect)
+            return None
+        finally:
+            # Nothing still queued is started; requests in flight end at their timeout
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_connections(self, deadline: Optional[float] = None) -> bool:
         if not self.token or not self.account_id_hash:
             return False
             
@@ -88,13 +380,20 @@ class LibreViewAPI:
         headers = self.get_headers()
         headers["authorization"] = f"Bearer {self.token}"
         headers["account-id"] = self.account_id_hash
+        deadline = deadline or time.monotonic() + self.CALL_DEADLINE
+        key = ("connections", self.token)
+        
+        def _fetch():
+            connections = self._cache.get(key)
+            if connections is None:
+                response = self._request("GET", url, deadline, retries=self.MAX_RETRIES, headers=headers)
+                response.raise_for_status()
+                connections = loads(response.content).get("data", [])
+                self._cache.set(key, connections, self.CONNECTIONS_TTL)
+            return connections
         
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            connections = data.get("data", [])
+            connections = self._flight.do(key, _fetch)
             if not connections:
                 return False
                 
@@ -106,41 +405,77 @@ class LibreViewAPI:
             print(f"Fetching connections failed: {e}")
             return False
 
-    def fetch_glucose_data(self) -> Optional[Dict[str, Any]]:
+    def fetch_glucose_data(self, series: Optional[GlucoseSeries] = None) -> Optional[GlucoseSeries]:
+        """Fetch the /graph window and merge it into `series` (a new one when omitted)."""
         if not self.patient_id or not self.token or not self.account_id_hash:
             return None
             
+        key = ("graph", self.patient_id)
+        data = self._cache.get(key)
+        if data is None:
+            # Refreshes that overlap an in-flight poll wait for it instead of re-requesting
+            data = self._flight.do(key, lambda: self._fetch_graph(key))
+        if data is None:
+            return None
+
+        with self._merge_lock:
+            if series is None:
+                series = GlucoseSeries()
+            series.update(data)
+        return series
+
+    def _fetch_graph(self, key) -> Optional[GlucoseData]:
         url = f"{self.base_url}/llu/connections/{self.patient_id}/graph"
+        deadline = time.monotonic() + self.CALL_DEADLINE
+        
+        try:
+            for _ in range(self.MAX_REDIRECTS + 1):
+                headers = self.get_headers()
+                headers["authorization"] = f"Bearer {self.token}"
+                headers["account-id"] = self.account_id_hash
+                response = self._request("GET", url, deadline, retries=self.MAX_RETRIES, headers=headers)
+                
+                min_version = self._min_version_from(response)
+                if min_version and min_version != self.min_version:
+                    self.min_version = min_version
+                    continue
+                
+                response.raise_for_status()
+                # Decode graphData straight into columns instead of keeping the dict list
+                data = decode_graph_response(response.content)
+                self._cache.set(key, data, self.GRAPH_TTL)
+                return data
+
+            print("Fetching glucose data failed: too many version redirects")
+            return None
+            
+        except Exception as e:
+            print(f"Fetching glucose data failed: {e}")
+            return None
+
+    def fetch_logbook(self) -> Optional[GraphColumns]:
+        """
+        Fetch the logbook (roughly two weeks of scans and alarm readings) as
+        columns in timestamp order. Used to backfill history gaps that have
+        already scrolled out of the /graph window.
+        """
+        if not self.patient_id or not self.token or not self.account_id_hash:
+            return None
+
+        url = f"{self.base_url}/llu/connections/{self.patient_id}/logbook"
         headers = self.get_headers()
         headers["authorization"] = f"Bearer {self.token}"
         headers["account-id"] = self.account_id_hash
-        
         try:
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 403:
-                data = response.json()
-                if "data" in data and "minimumVersion" in data["data"]:
-                    self.min_version = data["data"]["minimumVersion"]
-                    return self.fetch_glucose_data()
-            
+            response = self._request("GET", url, time.monotonic() + self.CALL_DEADLINE,
+                                     retries=self.MAX_RETRIES, headers=headers)
             response.raise_for_status()
-            data = response.json()
-            
-            connection_data = data.get("data", {}).get("connection", {})
-            glucose_measurement = connection_data.get("glucoseMeasurement", {})
-            graph_data = data.get("data", {}).get("graphData", [])
-            
-            return {
-                "current": {
-                    "value": glucose_measurement.get("Value"),
-                    "trend": glucose_measurement.get("TrendArrow"),
-                    "timestamp": glucose_measurement.get("Timestamp"),
-                    "color": glucose_measurement.get("MeasurementColor")
-                },
-                "graph": graph_data
-            }
-            
+            columns = decode_graph(loads(response.content).get("data") or [])
         except Exception as e:
-            print(f"Fetching glucose data failed: {e}")
+            print(f"Fetching logbook failed: {e}")
             return None
+
+        # The logbook lists newest first
+        rows = sorted(zip(*columns))
+        return GraphColumns(array('d', (r[0] for r in rows)), array('f', (r[1] for r in rows)),
+                            array('B', (r[2] for r in rows)))
@@ -0,0 +1,508 @@
+import customtkinter as ctk
+import threading
+import os
+import sys
+import time
+from PIL import Image, ImageTk
+
+from alerts import AlertEngine, NotificationDispatcher
+from api_client import LibreViewAPI
+from backfill import GapBackfiller
+from config import Config
+from episodes import LOOKBACK as EVENTS_LOOKBACK, EpisodeIndex, episode_rules
+from forecast import GlucoseForecaster
+from export import export_history, parse_date
+from glucose_data import GlucoseSeries, Reading, empty_columns
+from history import HistoryStore
+from importer import import_libreview_csv
+from pubsub import ReadingPublisher
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_POLL, PRIORITY_USER, CancellationToken, TaskScheduler
+from login_view import LoginView
+from nightscout import NightscoutUploader
+from ui_dispatcher import UIDispatcher
+from viewport import HistoryViewport
+from dashboard_view import DashboardView
+
+
+def tray_state(reading: Reading):
+    """The only state the tray process needs: rounded value and color index."""
+    return (int(round(reading.value)), reading.color)
+
+
+class LibreViewMonitorApp(ctk.CTk):
+    POLL_INTERVAL = 300
+    COMMAND_INTERVAL = 0.5
+    METRICS_INTERVAL = 3600
+
+    def __init__(self, glucose_queue, command_queue):
+        super().__init__()
+        
+        self.glucose_queue = glucose_queue
+        self.command_queue = command_queue
+        
+        self.title("LibreView Monitor")
+        self.geometry("600x700")
+
+        # Set window icon per-platform if an icon is present in project root
+        proj_root = os.path.abspath(os.path.dirname(__file__))
+        try:
+            ico = os.path.join(proj_root, 'icon.ico')
+            png = os.path.join(proj_root, 'icon.png')
+            # Windows: prefer .ico but fall back to PNG via iconphoto
+            if sys.platform == 'win32':
+                if os.path.exists(ico):
+                    try:
+                        self.iconbitmap(ico)
+                    except Exception:
+                        pass
+                elif os.path.exists(png):
+                    try:
+                        img = ImageTk.PhotoImage(Image.open(png))
+                        self.iconphoto(False, img)
+                        self._tk_icon_image = img
+                    except Exception:
+                        pass
+            else:
+                # Try PNG for Tk window icon (works on Linux and sometimes macOS)
+                if os.path.exists(png):
+                    try:
+                        img = ImageTk.PhotoImage(Image.open(png))
+                        self.iconphoto(False, img)
+                        # keep a reference to avoid GC
+                        self._tk_icon_image = img
+                    except Exception:
+                        pass
+
+                # On macOS, also attempt to set the Dock icon via AppKit if available
+                if sys.platform == 'darwin':
+                    icns = os.path.join(proj_root, 'icon.icns')
+                    try:
+                        if os.path.exists(icns):
+                            from AppKit import NSApplication, NSImage
+                            ns_app = NSApplication.sharedApplication()
+                            ns_img = NSImage.alloc().initWithContentsOfFile_(icns)
+                            ns_app.setApplicationIconImage_(ns_img)
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+        
+        ctk.set_default_color_theme("blue")
+
+        self.config = Config()
+        # Apply stored appearance mode (light/dark/system)
+        try:
+            ctk.set_appearance_mode(self.config.appearance_mode or "system")
+        except Exception:
+            try:
+                ctk.set_appearance_mode("system")
+            except Exception:
+                pass
+        self.api = LibreViewAPI(region=self.config.region, min_version=self.config.min_version)
+        # Live window of readings shared by the dashboard, alerts and tray
+        self.series = GlucoseSeries()
+        self.forecaster = GlucoseForecaster()
+        self.alert_engine = AlertEngine(self.config)
+        # Everything the live window has seen is kept in the local history, one
+        # database per account; it is opened at login and closed at logout
+        self.history = HistoryStore(connect=False)
+        self._open_history()
+        self._persisted_until = None
+        # Refresh and poll can run on different workers but share the forecaster,
+        # alert state and _persisted_until, so only one update runs at a time
+        self._update_lock = threading.Lock()
+        # Low/high runs over the whole history, so the events list never rescans it
+        self.episode_index = EpisodeIndex(self.history)
+        self.notifier = NotificationDispatcher()
+        # Local subscribers (home automation, bedside displays) get readings from our poll.
+        # Opt-in from Settings; an unstarted publisher ignores publish() calls.
+        self.publisher = ReadingPublisher()
+        if self.config.publish_readings:
+            self.publisher.start()
+        # Optional mirror into a Nightscout site, fed from the same poll
+        self.uploader = None
+        self._configure_uploader()
+        
+        self.stop_event = threading.Event()
+        # All background work (login, refresh, polling, tray commands) runs here
+        self.scheduler = TaskScheduler(workers=3)
+        self._poll_task = None
+        # Refills history holes from the logbook after sleep or outages
+        self.backfiller = GapBackfiller(self.history, self.scheduler, on_backfilled=self._on_backfilled)
+        # Windows of history for panning back through the graph, cached and prefetched
+        self.viewport = HistoryViewport(self.history, self.scheduler, on_ready=self._on_viewport_ready)
+        
+        # Worker threads never touch Tk directly; they post per-widget updates here
+        self.ui = UIDispatcher(self)
+        self.ui.start()
+
+        self.protocol("WM_DELETE_WINDOW", self._on_hide_window)
+        # Minimizing counts as hidden too
+        self._hidden = False
+        self.bind("<Unmap>", self._on_unmap, add="+")
+        self.bind("<Map>", self._on_map, add="+")
+        self._show_initial_view()
+        
+        # Start command listener
+        self.scheduler.call_every(self.COMMAND_INTERVAL, self._poll_commands,
+                                  priority=PRIORITY_USER, name="tray-commands")
+        self.scheduler.call_every(self.METRICS_INTERVAL, self._log_metrics, name="metrics",
+                                  initial_delay=self.METRICS_INTERVAL)
+
+    def _log_metrics(self):
+        m = self.scheduler.metrics()
+        print(f"Scheduler: {m['completed']} done, {m['failed']} failed, {m['queue_depth']} queued; "
+              f"wait avg {m['avg_latency'] * 1000:.0f} ms, max {m['max_latency'] * 1000:.0f} ms; "
+              f"run avg {m['avg_runtime'] * 1000:.0f} ms")
+
+    def _poll_commands(self):
+        while True:
+            try:
+                cmd = self.command_queue.get_nowait()
+            except Exception:
+                return
+            if cmd == "SHOW":
+                self.ui.post("show", self.show_window)
+            elif cmd == "SNOOZE":
+                self.alert_engine.snooze(3600)
+            elif cmd == "QUIT":
+                self.ui.post("quit", self._on_closing)
+
+    def show_window(self):
+        self.deiconify()
+        self.focus_force()
+        self.lift()
+        self._set_hidden(False)
+
+    def _on_hide_window(self):
+        self.withdraw()
+        self._set_hidden(True)
+
+    def _on_unmap(self, event):
+        if event.widget is self and self.state() == "iconic":
+            self._set_hidden(True)
+
+    def _on_map(self, event):
+        if event.widget is self and self._hidden:
+            self._set_hidden(False)
+
+    def _set_hidden(self, hidden):
+        # Polling, tray and alerts keep running; only dashboard rendering is deferred
+        self._hidden = hidden
+        if hasattr(self, "dashboard"):
+            self.dashboard.set_suspended(hidden)
+
+    def _show_initial_view(self):
+        password = self.config.get_password()
+        if self.config.email and password:
+            self._show_dashboard()
+            self._start_monitor()
+        else:
+            self._show_login()
+
+    def _show_login(self):
+        if hasattr(self, "dashboard"):
+            self.dashboard.destroy()
+        self.login = LoginView(self, on_login_success=self._handle_login)
+        self.login.pack(fill="both", expand=True)
+
+    def _show_dashboard(self):
+        if hasattr(self, "login"):
+            self.login.destroy()
+        self.dashboard = DashboardView(self, on_refresh=self._force_refresh, on_logout=self._handle_logout,
+                                       config=self.config, on_export=self._handle_export,
+                                       on_import=self._handle_import, on_nightscout=self._handle_nightscout,
+                                       on_publish=self._handle_publish,
+                                       viewport=self.viewport)
+        self.dashboard.pack(fill="both", expand=True)
+        self.dashboard.set_suspended(self._hidden)
+        self.scheduler.submit(self._load_events, priority=PRIORITY_BACKGROUND, name="events")
+        
+
+    def _handle_login(self, email, password):
+        def _login_thread():
+            if not self.api.token:
+                # A returning account skips region discovery and version negotiation
+                hint = self.config.account_hint(email)
+                if hint:
+                    self.api = LibreViewAPI(region=hint.get("region"), min_version=hint.get("min_version"))
+            if self.api.login(email, password):
+                self.config.email = email
+                self.config.set_password(password)
+                self.config.region = self.api.region
+                self.config.min_version = self.api.min_version
+                self.config.save()
+                self.config.remember_account(email, self.api.region, self.api.min_version)
+                self._open_history()
+                
+                self.ui.post("view", self._show_dashboard)
+                self._start_monitor()
+            else:
+                self.ui.post("login-error", lambda: self.login.show_error("Login failed. Check credentials."))
+        
+        self.scheduler.submit(_login_thread, priority=PRIORITY_USER, name="login")
+
+    def _handle_logout(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self.config.clear()
+        self.api = LibreViewAPI()
+        self.series = GlucoseSeries()
+        self.forecaster.reset()
+        self.alert_engine.reset()
+        self._persisted_until = None
+        # The cleared config has sharing off; subscribers must not see the next account's readings
+        self._configure_publisher()
+        # The cleared config has no Nightscout site; stop mirroring this account's readings
+        self._close_uploader()
+        self.backfiller.reset()
+        self.viewport.clear()
+        # The next account gets its own history; nothing of this one is shown, exported or mirrored
+        self.episode_index.reset()
+        self.history.close()
+        self._show_login()
+
+    def _open_history(self):
+        path = self.config.history_path()
+        # Logging in again as the same account keeps the store that is already open
+        if path is not None and not (self.history.is_open and self.history.path == path):
+            self.history.open(path)
+
+    def _force_refresh(self):
+        self.scheduler.submit(self._update_data, priority=PRIORITY_USER, name="refresh")
+
+    def _update_data(self):
+        # A refresh that arrives while a poll is updating is served by that run
+        if not self._update_lock.acquire(blocking=False):
+            return
+        try:
+            self._fetch_and_apply()
+        finally:
+            self._update_lock.release()
+
+    def _fetch_and_apply(self):
+        if not self.config.email: return
+        
+        password = self.config.get_password()
+        if not self.api.token:
+            if not password or not self.api.login(self.config.email, password):
+                status = self.api.breaker.describe() or "Login failed, will retry"
+                self.ui.post("status", lambda: self.dashboard.set_status(status))
+                return
+
+        series = self.api.fetch_glucose_data(self.series)
+        if series is None:
+            status = self.api.breaker.describe() or "Update failed, will retry"
+            self.ui.post("status", lambda: self.dashboard.set_status(status))
+            return
+        if not series.latest:
+            # A successful fetch with no readings yet (sensor warm-up, new account) is not a failure
+            self.ui.post("status", lambda: self.dashboard.set_status("Connected, no readings yet"))
+        else:
+            self.forecaster.sync(series)
+            forecast = self.forecaster.forecast()
+            # Bursts of refreshes collapse into one update per widget
+            self.ui.post("value", lambda: self.dashboard.update_value(series, forecast))
+            self.ui.post("graph", lambda: self.dashboard.update_graph(series, forecast))
+            self.ui.post("status", lambda: self.dashboard.set_status("Data updated successfully"))
+            
+            try:
+                self.glucose_queue.put(tray_state(series.latest))
+            except:
+                pass
+            
+            self._check_alerts(series)
+            
+            new_readings = series.columns(since=self._persisted_until)
+            self._persisted_until = series.latest.timestamp
+            # Graph points that arrived behind the live series still belong in history and the mirrors
+            late = series.drain_late()
+            if len(late):
+                late.times.extend(new_readings.times)
+                late.values.extend(new_readings.values)
+                late.flags.extend(new_readings.flags)
+                new_readings = late
+            self.publisher.publish(new_readings, trend=series.latest.trend)
+            if self.uploader is not None:
+                self._submit_upload(self.uploader, new_readings, series.latest.trend)
+            self.scheduler.submit(self._persist_readings, new_readings, bool(len(late)),
+                                  priority=PRIORITY_BACKGROUND, name="persist-history")
+            
+            if self.api.min_version != self.config.min_version:
+                self.config.min_version = self.api.min_version
+                self.scheduler.submit(self._save_negotiated, priority=PRIORITY_BACKGROUND, name="save-config")
+
+    def _save_negotiated(self):
+        self.config.save()
+        self.config.remember_account(self.config.email, self.api.region, self.api.min_version)
+
+    def _persist_readings(self, columns, backdated=False):
+        self.history.add_columns(columns)
+        if len(columns):
+            self.viewport.invalidate(columns.times[0])
+        self._load_events(since=columns.times[0] if backdated else None)
+        # Gap detection only makes sense once this poll's readings are stored
+        self.backfiller.schedule(self.api)
+
+    def _close_uploader(self):
+        uploader, self.uploader = self.uploader, None
+        if uploader is not None:
+            # A flush may still be using its connection; close once it stops, off the Tk thread
+            self.scheduler.submit(uploader.close, priority=PRIORITY_BACKGROUND, name="nightscout-close")
+
+    def _configure_uploader(self):
+        self._close_uploader()
+        if self.config.nightscout_url:
+            try:
+                self.uploader = NightscoutUploader(self.config.nightscout_url, self.config.get_nightscout_secret())
+            except Exception as e:
+                print(f"Nightscout uploader disabled: {e}")
+
+    def _submit_upload(self, uploader, columns, trend):
+        token = CancellationToken()
+        self.scheduler.submit(self._upload_readings, uploader, columns, trend, token,
+                              priority=PRIORITY_BACKGROUND, name="nightscout-upload", token=token)
+
+    def _upload_readings(self, uploader, columns, trend, token):
+        uploader.enqueue(columns, trend)
+        uploader.flush(token=token)
+        if uploader is not self.uploader:
+            return  # replaced or closed meanwhile
+        status = uploader.describe()
+        self.ui.post("upload", lambda: self.dashboard.set_upload_status(status))
+
+    def _mirror_history(self, ranges):
+        # Readings backfilled or imported into the past were never polled, so queue them from the history
+        if self.uploader is None or not ranges:
+            return
+        token = CancellationToken()
+        self.scheduler.submit(self._mirror_ranges, self.uploader, ranges, token,
+                              priority=PRIORITY_BACKGROUND, name="nightscout-mirror", token=token)
+
+    def _mirror_ranges(self, uploader, ranges, token):
+        # Streamed chunk by chunk, so a large import is never held in memory at once
+        for start, end in ranges:
+            for chunk in self.history.iter_chunks(start, end):
+                if token.cancelled:
+                    return
+                uploader.enqueue(chunk)
+        self._upload_readings(uploader, empty_columns(), None, token)
+
+    def _handle_nightscout(self, url, secret):
+        self.config.nightscout_url = url
+        if secret is not None:
+            self.config.set_nightscout_secret(secret)
+        self.config.save()
+        self._configure_uploader()
+        if self.uploader is None:
+            self.dashboard.set_upload_status("")
+            return
+        # Drain anything left in the outbox from before
+        uploader = self.uploader
+        self.dashboard.set_upload_status(uploader.describe())
+        self._submit_upload(uploader, self.series.columns(), None)
+
+    def _handle_publish(self, enabled):
+        self.config.publish_readings = enabled
+        self.config.save()
+        if self._configure_publisher():
+            self.dashboard.set_publish_status(f"Listening on {self.publisher.address}" if enabled else "")
+        else:
+            self.dashboard.set_publish_status("Address in use")
+
+    def _configure_publisher(self):
+        # A stopped publisher cannot be restarted, so every change starts from a fresh one
+        self.publisher.stop(timeout=1)
+        self.publisher = ReadingPublisher()
+        return not self.config.publish_readings or self.publisher.start()
+
+    def _load_events(self, since=None):
+        low, high, min_duration, merge_gap = episode_rules(self.config)
+        self.episode_index.configure(low, high)
+        self.episode_index.refresh(since)
+        now = time.time()
+        events = self.episode_index.episodes(now - EVENTS_LOOKBACK, now, min_duration, merge_gap)
+        self.ui.post("events", lambda: self.dashboard.set_history_events(events))
+
+    def _on_viewport_ready(self):
+        self.ui.post("history", lambda: self.dashboard.refresh_history())
+
+    def _on_backfilled(self, count, gaps):
+        self.viewport.clear()
+        self._load_events(since=min(start for start, _ in gaps))
+        # Each gap runs from the last reading before it to the first after; both were stored already
+        self._mirror_history([(start + 1, end) for start, end in gaps])
+        self.ui.post("status", lambda: self.dashboard.set_status(f"Recovered {count} missed readings from the logbook"))
+
+    def _handle_export(self, path, start, end, fmt):
+        token = CancellationToken()
+
+        def report(done, total):
+            pct = 100 * done // total if total else 100
+            self.ui.post("export", lambda: self.dashboard.set_export_progress(f"Exporting... {done}/{total} ({pct}%)"))
+
+        def _export():
+            try:
+                rows = export_history(self.history, path,
+                                      parse_date(start) if start else None,
+                                      parse_date(end, end=True) if end else None,
+                                      fmt, progress=report, token=token)
+                text = f"Exported {rows} readings to {os.path.basename(path)}"
+            except Exception as e:
+                text = f"Export failed: {e}"
+            self.ui.post("export", lambda: self.dashboard.set_export_progress(text, finished=True))
+
+        self.scheduler.submit(_export, priority=PRIORITY_BACKGROUND, name="export", token=token)
+
+    def _handle_import(self, path):
+        token = CancellationToken()
+
+        def report(read, inserted):
+            self.ui.post("import", lambda: self.dashboard.set_import_progress(f"Importing... {read} read, {inserted} new"))
+
+        def _import():
+            try:
+                read, inserted, start, end = import_libreview_csv(self.history, path, progress=report, token=token)
+                if inserted:
+                    self.viewport.clear()
+                    # Imported readings can land anywhere in the past
+                    self.episode_index.reset()
+                    self._load_events()
+                    self._mirror_history([(start, end)])
+                text = f"Imported {inserted} new of {read} readings from {os.path.basename(path)}"
+            except Exception as e:
+                text = f"Import failed: {e}"
+            self.ui.post("import", lambda: self.dashboard.set_import_progress(text, finished=True))
+
+        # Background priority: polling and refreshes keep running on the other workers
+        self.scheduler.submit(_import, priority=PRIORITY_BACKGROUND, name="import", token=token)
+
+    def _start_monitor(self):
+        # A single polling task serves every login; a second one would double the /graph requests
+        if self._poll_task is not None and not self._poll_task.cancelled:
+            return
+        self._poll_task = self.scheduler.call_every(self.POLL_INTERVAL, self._update_data,
+                                                    priority=PRIORITY_POLL, name="poll")
+
+    def _check_alerts(self, series):
+        # Rules are cheap; delivery happens on the notifier thread
+        try:
+            for alert in self.alert_engine.evaluate(series):
+                self.notifier.post(alert)
+        except Exception as e:
+            print(f"Alert evaluation failed: {e}")
+
+    def _on_closing(self):
+        self.stop_event.set()
+        self.ui.stop()
+        # Let in-flight tasks finish (bounded), drop queued ones, then tear down Tk
+        self.scheduler.shutdown(timeout=3)
+        self._log_metrics()
+        self.notifier.stop(timeout=1)
+        self.publisher.stop(timeout=1)
+        if self.uploader is not None:
+            # A flush still in a request after the scheduler shutdown is left to die with the process
+            self.uploader.close(timeout=2)
+        self.history.close()
+        self.destroy()
@@ -0,0 +1,92 @@
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from glucose_data import GraphColumns
+from history import SOURCE_BACKFILL, HistoryStore
+from scheduler import PRIORITY_BACKGROUND, TaskHandle, TaskScheduler
+
+
+class GapBackfiller:
+    """
+    Finds holes in the history left by sleep or network outages and fills
+    them from the logbook endpoint once the app is back online.
+
+    Gaps inside the /graph window are closed by the normal poll, so anything
+    still missing afterwards has scrolled out of it. Passes run at background
+    priority, at most one at a time. There is at most one logbook request per
+    MIN_INTERVAL, and the breaker must be closed, so backfill never competes
+    with the live poll. A gap the logbook cannot fill (it only holds scans and
+    alarms) is given up after MAX_ATTEMPTS.
+    """
+    LOOKBACK = 14 * 24 * 3600  # about as far back as the logbook reaches
+    MIN_GAP = 30 * 60
+    MIN_INTERVAL = 30 * 60
+    MAX_ATTEMPTS = 3
+    # Logbook timestamps can differ slightly from the same polled reading
+    DEDUPE_WINDOW = 60
+
+    def __init__(self, history: HistoryStore, scheduler: TaskScheduler,
+                 on_backfilled: Optional[Callable[[int, List[Tuple[int, int]]], None]] = None):
+        self.history = history
+        self.scheduler = scheduler
+        self.on_backfilled = on_backfilled
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_fetch = float("-inf")
+        self._attempts: Dict[Tuple[int, int], int] = {}
+
+    def schedule(self, api) -> Optional[TaskHandle]:
+        """Queue a backfill pass for `api`'s account unless one is running or rate-limited."""
+        with self._lock:
+            if self._running or time.monotonic() - self._last_fetch < self.MIN_INTERVAL:
+                return None
+            self._running = True
+        return self.scheduler.submit(self._run, api, priority=PRIORITY_BACKGROUND, name="backfill")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._attempts.clear()
+            self._last_fetch = float("-inf")
+
+    def _run(self, api) -> int:
+        try:
+            now = time.time()
+            gaps = [g for g in self.history.find_gaps(now - self.LOOKBACK, now, self.MIN_GAP)
+                    if self._attempts.get(g, 0) < self.MAX_ATTEMPTS]
+            if not gaps or api.breaker.state != api.breaker.CLOSED:
+                return 0
+
+            with self._lock:
+                self._last_fetch = time.monotonic()
+                for gap in gaps:
+                    self._attempts[gap] = self._attempts.get(gap, 0) + 1
+            logbook = api.fetch_logbook()
+            if not logbook:
+                return 0
+
+            inserted = self.history.add_columns(self._inside(logbook, gaps), source=SOURCE_BACKFILL,
+                                                dedupe_window=self.DEDUPE_WINDOW)
+            if inserted and self.on_backfilled:
+                # Readings only went into the gaps, so they are all the caller needs to revisit
+                self.on_backfilled(inserted, gaps)
+            return inserted
+        finally:
+            with self._lock:
+                self._running = False
+
+    @staticmethod
+    def _inside(columns: GraphColumns, gaps) -> GraphColumns:
+        """Keep only readings strictly inside one of the (sorted, disjoint) gaps."""
+        times = np.frombuffer(columns.times, dtype=np.float64)
+        starts = np.array([g[0] for g in gaps], dtype=np.float64)
+        ends = np.array([g[1] for g in gaps], dtype=np.float64)
+        idx = np.clip(np.searchsorted(starts, times, side="right") - 1, 0, None)
+        keep = (times > starts[idx]) & (times < ends[idx])
+        values = np.frombuffer(columns.values, dtype=np.float32)
+        flags = np.frombuffer(columns.flags, dtype=np.uint8)
+        return GraphColumns(array('d', times[keep].tobytes()), array('f', values[keep].tobytes()),
+                            array('B', flags[keep].tobytes()))
@@ -1,6 +1,7 @@
 import json
 import os
 import base64
+import hashlib
 from cryptography.fernet import Fernet
 import uuid
 
@@ -9,6 +10,9 @@ class Config:
     CONFIG_FILE = os.path.expanduser("~/.libreview_monitor.json")
     # A local key to provide some level of encryption for the stored password
     _KEY_FILE = os.path.expanduser("~/.libreview_monitor.key")
+    # Negotiated region and API version per account. Kept across logout so
+    # logging back in takes a single round-trip; accounts are keyed by hash.
+    ACCOUNTS_FILE = os.path.expanduser("~/.libreview_monitor_accounts.json")
     
     def __init__(self):
         self.email = ""
@@ -17,6 +21,16 @@ class Config:
         self.appearance_mode = "system"
         self.low_threshold = 70
         self.high_threshold = 180
+        self.alert_hysteresis = 10
+        self.alert_quiet_minutes = 30
+        self.predict_low_minutes = 20
+        self.episode_min_minutes = 15
+        self.episode_merge_minutes = 15
+        self.smoothing = "savgol"
+        self.graph_renderer = "matplotlib"
+        self.publish_readings = False
+        self.nightscout_url = ""
+        self.nightscout_secret_enc = ""
         self.encrypted_password = ""
         self.load()
         self._key = self._get_or_create_key()
@@ -42,6 +56,16 @@ class Config:
                     self.appearance_mode = data.get("appearance_mode", "system")
                     self.low_threshold = data.get("low_threshold", 70)
                     self.high_threshold = data.get("high_threshold", 180)
+                    self.alert_hysteresis = data.get("alert_hysteresis", 10)
+                    self.alert_quiet_minutes = data.get("alert_quiet_minutes", 30)
+                    self.predict_low_minutes = data.get("predict_low_minutes", 20)
+                    self.episode_min_minutes = data.get("episode_min_minutes", 15)
+                    self.episode_merge_minutes = data.get("episode_merge_minutes", 15)
+                    self.smoothing = data.get("smoothing", "savgol")
+                    self.graph_renderer = data.get("graph_renderer", "matplotlib")
+                    self.publish_readings = data.get("publish_readings", False)
+                    self.nightscout_url = data.get("nightscout_url", "")
+                    self.nightscout_secret_enc = data.get("nightscout_secret_enc", "")
                     self.encrypted_password = data.get("password_enc", "")
             except Exception as e:
                 print(f"Error loading config: {e}")
@@ -54,6 +78,16 @@ class Config:
             "appearance_mode": self.appearance_mode,
             "low_threshold": self.low_threshold,
             "high_threshold": self.high_threshold,
+            "alert_hysteresis": self.alert_hysteresis,
+            "alert_quiet_minutes": self.alert_quiet_minutes,
+            "predict_low_minutes": self.predict_low_minutes,
+            "episode_min_minutes": self.episode_min_minutes,
+            "episode_merge_minutes": self.episode_merge_minutes,
+            "smoothing": self.smoothing,
+            "graph_renderer": self.graph_renderer,
+            "publish_readings": self.publish_readings,
+            "nightscout_url": self.nightscout_url,
+            "nightscout_secret_enc": self.nightscout_secret_enc,
             "password_enc": self.encrypted_password
         }
         try:
@@ -82,6 +116,61 @@ class Config:
         except Exception as e:
             print(f"Encryption error: {e}")
 
+    def get_nightscout_secret(self):
+        if not self.nightscout_secret_enc:
+            return ""
+        try:
+            f = Fernet(self._key)
+            return f.decrypt(self.nightscout_secret_enc.encode()).decode()
+        except Exception as e:
+            print(f"Decryption error: {e}")
+            return ""
+
+    def set_nightscout_secret(self, secret):
+        try:
+            f = Fernet(self._key)
+            self.nightscout_secret_enc = f.encrypt(secret.encode()).decode() if secret else ""
+        except Exception as e:
+            print(f"Encryption error: {e}")
+
+    def _load_accounts(self):
+        if not os.path.exists(self.ACCOUNTS_FILE):
+            return {}
+        try:
+            with open(self.ACCOUNTS_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading account hints: {e}")
+            return {}
+
+    @staticmethod
+    def _account_key(email):
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+    def history_path(self):
+        """This account's history database, keyed like the account hints; None when logged out."""
+        if not self.email:
+            return None
+        from history import HistoryStore
+        return HistoryStore.account_path(self._account_key(self.email))
+
+    def account_hint(self, email):
+        """Last known {"region", "min_version"} for `email`, or an empty dict."""
+        if not email:
+            return {}
+        return self._load_accounts().get(self._account_key(email), {})
+
+    def remember_account(self, email, region, min_version):
+        if not email or region is None:
+            return
+        accounts = self._load_accounts()
+        accounts[self._account_key(email)] = {"region": region, "min_version": min_version}
+        try:
+            with open(self.ACCOUNTS_FILE, 'w') as f:
+                json.dump(accounts, f)
+        except Exception as e:
+            print(f"Error saving account hints: {e}")
+
     def clear(self):
         if os.path.exists(self.CONFIG_FILE):
             os.remove(self.CONFIG_FILE)
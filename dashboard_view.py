@@ -1,15 +1,51 @@
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
+from tkinter import filedialog, ttk
 import numpy as np
 from datetime import datetime
 
+import time
+from typing import Optional
+
+from episodes import EPISODE_HIGH, EPISODE_LOW, EpisodeTracker, episode_rules
+from forecast import Forecast, trend_from_slope
+from glucose_data import GlucoseSeries, GraphColumns, empty_columns
+from graph_renderer import RENDERER_CANVAS, RENDERER_MATPLOTLIB, GraphScene, create_renderer, graph_theme
+from smoothing import SmoothedSeries
+from viewport import ZOOM_LEVELS
+
+# API trend arrows older than this are replaced by the locally derived trend
+TREND_STALE_SECONDS = 15 * 60
+
+
+def _format_duration(seconds: float) -> str:
+    minutes = int(round(seconds / 60))
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60} h {minutes % 60:02d} min"
+
+
 class DashboardView(ctk.CTkFrame):
-    def __init__(self, master, on_refresh, on_logout, config=None, **kwargs):
+    _RENDERER_LABELS = {RENDERER_MATPLOTLIB: "Matplotlib graph", RENDERER_CANVAS: "Lightweight graph"}
+    _EVENT_PERIODS = {"24 hours": 1, "7 days": 7, "30 days": 30, "90 days": 90}
+    # (column, heading, width, sort key)
+    _EVENT_COLUMNS = (
+        ("kind", "Event", 70, lambda e: (e.kind, e.start)),
+        ("start", "Started", 140, lambda e: e.start),
+        ("duration", "Duration", 90, lambda e: e.duration),
+        ("extreme", "Nadir / peak", 100, lambda e: e.extreme),
+    )
+    # Pixels the pointer must move before a press on the graph becomes a pan
+    PAN_THRESHOLD = 6
+
+    def __init__(self, master, on_refresh, on_logout, config=None, on_export=None, on_import=None,
+                 on_nightscout=None, on_publish=None, viewport=None, **kwargs):
         super().__init__(master, **kwargs)
+        self.on_nightscout = on_nightscout
+        self.on_publish = on_publish
         self.on_refresh = on_refresh
         self.on_logout = on_logout
+        self.on_export = on_export
+        self.on_import = on_import
         self.config = config
 
         self.grid_columnconfigure(0, weight=1)
@@ -18,6 +54,7 @@ class DashboardView(ctk.CTkFrame):
         # Tabview: Monitor and Settings
         self.tabview = ctk.CTkTabview(self)
         self.tabview.add("Monitor")
+        self.tabview.add("Events")
         self.tabview.add("Settings")
         self.tabview.grid(row=0, column=0, sticky="nsew", padx=8, pady=8)
 
@@ -66,58 +103,82 @@ class DashboardView(ctk.CTkFrame):
         self.graph_frame.grid_columnconfigure(0, weight=1)
         self.graph_frame.grid_rowconfigure(0, weight=1)
         
-        self.fig, self.ax = plt.subplots(figsize=(6, 3), dpi=100)
-        self.fig.patch.set_facecolor('#2b2b2b') # Matches CTK dark mode
-        self.ax.set_facecolor('#2b2b2b')
-        self.ax.tick_params(colors='white')
-        for spine in self.ax.spines.values():
-            spine.set_color('white')
-            
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
-        # inset the canvas so rounded corners of the CTkFrame are visible
-        self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew", padx=8, pady=8)
-        # initialize graph frame background to match figure
-        try:
-            rgba = self.fig.get_facecolor()
-            if isinstance(rgba, (tuple, list)) and len(rgba) >= 3:
-                r, g, b = rgba[0], rgba[1], rgba[2]
-                hexc = '#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255))
-            else:
-                hexc = None
-            if hexc:
-                try:
-                    self.graph_frame.configure(fg_color=hexc)
-                except Exception:
-                    pass
-                try:
-                    self.canvas.get_tk_widget().configure(bg=hexc)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        
+        # Dragging or scrolling the graph leaves the live view and pans through
+        # the stored history; _view_span is None while following live data.
+        # A view whose end sits at the live edge keeps following new readings.
+        self.viewport = viewport
+        self._view_span = None
+        self._view_end = 0.0
+        self._view_at_live = False
+        self._drag = None
+
+        # Graph renderer is pluggable: matplotlib, or a lightweight native canvas
+        self.renderer = None
+        self._create_renderer(getattr(self.config, 'graph_renderer', RENDERER_MATPLOTLIB))
+
         # Status Bar
         self.status_bar = ctk.CTkLabel(self.monitor_frame, text="Ready", font=ctk.CTkFont(size=10))
         self.status_bar.grid(row=3, column=0, sticky="ew", padx=20, pady=5)
+        # Uploader throughput and queue depth; empty while no uploader is configured
+        self.upload_status = ctk.CTkLabel(self.monitor_frame, text="", font=ctk.CTkFont(size=10))
+        self.upload_status.grid(row=4, column=0, sticky="ew", padx=20, pady=(0, 5))
+
+        # Low/high episodes: tracked live over the series, and from the stored history for the list
+        self._episodes = EpisodeTracker()
+        self._history_events = []
+        self._event_rows = {}
+        self._events_sort = ("start", True)
+        self._build_events_tab()
 
         # Settings tab UI
         self._build_settings_tab()
-        # Keep last graph points so we can redraw after theme changes
-        self._last_graph_points = []
+        # Keep last graph columns so we can redraw after theme changes
+        self._last_graph = empty_columns()
+        self._last_forecast = None
+        # Smoothed values are cached next to the series and updated per new reading
+        self._smoothed = SmoothedSeries(getattr(self.config, 'smoothing', 'savgol'))
+        self._last_smoothed = None
+        # While hidden to the tray updates only record the latest state
+        self._suspended = False
+        self._dirty = None
+        self._events_dirty = False
         # Apply initial widget theme (logout button styling etc.)
         try:
             self._apply_widget_theme()
         except Exception:
             pass
 
-    def update_data(self, glucose_data):
-        if not glucose_data:
+    def set_suspended(self, suspended: bool):
+        """Stop rendering while the window is hidden; resuming renders once from the latest state."""
+        self._suspended = suspended
+        if not suspended and self._dirty is not None:
+            series, forecast = self._dirty
+            self._dirty = None
+            self.update_data(series, forecast)
+        if not suspended and self._events_dirty:
+            self._refresh_events_list()
+
+    def update_data(self, series: GlucoseSeries, forecast: Optional[Forecast] = None):
+        self.update_value(series, forecast)
+        self.update_graph(series, forecast)
+        if not self._suspended:
+            self.set_status("Data updated successfully")
+
+    def update_value(self, series: GlucoseSeries, forecast: Optional[Forecast] = None):
+        """Current value, trend arrow and timestamp."""
+        if self._suspended:
+            self._dirty = (series, forecast)
+            return
+        latest = series.latest if series else None
+        if not latest:
             return
             
-        current = glucose_data.get("current", {})
-        val = current.get("value")
-        trend = current.get("trend")
-        color_idx = current.get("color", 1) # 1: Green, 2: Yellow, 3: Red etc.
+        val = int(round(latest.value))
+        trend = latest.trend
+        if forecast is not None and (not trend or time.time() - latest.timestamp > TREND_STALE_SECONDS):
+            # TrendArrow missing or stale: fall back to the forecaster's slope
+            trend = trend_from_slope(forecast.slope)
+        color_idx = latest.color # 1: Green, 2: Yellow, 3: Red etc.
         
         # Trend arrows mapping
         trends = {
@@ -179,171 +240,307 @@ class DashboardView(ctk.CTkFrame):
             except Exception:
                 pass
         self.time_label.configure(text=f"Last updated: {datetime.now().strftime('%H:%M:%S')}")
-        
-        graph_payload = glucose_data.get("graph", [])
-        # store latest graph payload for redraws when theme changes
-        try:
-            self._last_graph_points = graph_payload or []
-        except Exception:
-            self._last_graph_points = []
-        # (debug prints removed)
-
-        self._update_graph(graph_payload)
-        self.status_bar.configure(text="Data updated successfully")
 
-    def _update_graph(self, graph_points):
-        self.ax.clear()
-        # theme-aware background colors
-        appearance = "system"
+    def update_graph(self, series: GlucoseSeries, forecast: Optional[Forecast] = None):
+        if self._suspended:
+            self._dirty = (series, forecast)
+            return
+        if not series or not len(series):
+            return
+        # store latest graph columns for redraws when theme changes
+        self._last_graph = series.columns()
+        self._smoothed.sync(series)
+        self._last_smoothed = self._smoothed.values(series)
+        self._last_forecast = forecast
+        self._episodes.configure(*episode_rules(self.config))
+        if self._episodes.sync(series):
+            self._refresh_events_list()
+
+        self._update_graph(self._last_graph)
+
+    def _create_renderer(self, kind):
+        if self.renderer is not None:
+            self.renderer.destroy()
+        self.renderer = create_renderer(kind, self.graph_frame)
+        self.renderer_kind = kind
+        # inset the graph so rounded corners of the CTkFrame are visible
+        self.renderer.widget.grid(row=0, column=0, sticky="nsew", padx=8, pady=8)
+        if self.viewport is not None:
+            self._bind_pan_zoom(self.renderer.widget)
+
+    def destroy(self):
+        # Release the figure and cancel pending animation callbacks with the view
+        if self.renderer is not None:
+            self.renderer.destroy()
+            self.renderer = None
+        super().destroy()
+
+    def _graph_theme(self):
         try:
             appearance = ctk.get_appearance_mode() or 'system'
         except Exception:
             appearance = 'system'
+        return graph_theme(appearance)
 
-        eff_app = appearance.lower()
-        # treat 'system' as 'dark' to avoid automatic white backgrounds
-        if eff_app == 'system':
-            eff_app = 'dark'
-
-        if eff_app == 'light':
-            bg_color = '#f3f3f5'  # slightly off-white to avoid full white
-            fg_color = 'black'
-            line_color = '#1f77b4'
-        else:
-            bg_color = '#2b2b2b'
-            fg_color = 'white'
-            line_color = '#3498db'
-
-        # Apply figure and axes background and sync frame/canvas
+    def _update_graph(self, graph: GraphColumns):
+        if self.renderer is None:
+            return
+        if self._view_span is not None:
+            if self._view_at_live:
+                self._view_end = self._live_end()
+            self._render_history()
+            return
+        theme = self._graph_theme()
         try:
-            self.fig.patch.set_facecolor(bg_color)
+            self._sync_graph_bg(theme.bg)
         except Exception:
             pass
-        self.ax.set_facecolor(bg_color)
 
+        scene = None
+        if len(graph):
+            values = np.frombuffer(graph.values, dtype=np.float32)
+            # Smoothed values come from the incremental cache; the newest point is the raw measurement
+            smooth_vals = values
+            if self._last_smoothed is not None and len(self._last_smoothed) == len(values):
+                smooth_vals = np.frombuffer(self._last_smoothed, dtype=np.float32)
+            scene = GraphScene(np.frombuffer(graph.times, dtype=np.float64), smooth_vals, float(values[-1]),
+                               self._last_forecast,
+                               low=getattr(self.config, 'low_threshold', 70),
+                               high=getattr(self.config, 'high_threshold', 180),
+                               episodes=tuple(self._episodes.episodes))
+        self.renderer.render(scene, theme)
+
+    # -- history pan/zoom ------------------------------------------------------
+
+    def _bind_pan_zoom(self, widget):
+        widget.bind("<ButtonPress-1>", self._on_pan_start, add="+")
+        widget.bind("<B1-Motion>", self._on_pan, add="+")
+        widget.bind("<ButtonRelease-1>", self._on_pan_end, add="+")
+        # Windows/macOS report the wheel as <MouseWheel>, X11 as buttons 4 and 5
+        widget.bind("<MouseWheel>", self._on_wheel, add="+")
+        widget.bind("<Button-4>", self._on_wheel, add="+")
+        widget.bind("<Button-5>", self._on_wheel, add="+")
+        widget.bind("<Double-Button-1>", self._on_view_live, add="+")
+
+    def _live_end(self) -> float:
+        if self._last_forecast is not None and len(self._last_forecast.times):
+            return float(self._last_forecast.times[-1])
+        if len(self._last_graph):
+            return float(self._last_graph.times[-1])
+        return time.time()
+
+    def _enter_history(self):
+        if self._view_span is not None:
+            return
+        # Start from the zoom level closest to what the live graph shows
+        shown = self._live_end() - (self._last_graph.times[0] if len(self._last_graph) else 0)
+        self._view_span = next((s for s in ZOOM_LEVELS if s >= shown), ZOOM_LEVELS[-1])
+        self._set_view_end(self._live_end())
+
+    def _set_view_end(self, end: float):
+        live_end = self._live_end()
+        self._view_end = min(end, live_end)
+        self._view_at_live = self._view_end >= live_end
+
+    def _graph_width(self) -> int:
         try:
-            self._sync_graph_bg(bg_color)
+            return max(1, self.renderer.widget.winfo_width())
         except Exception:
-            pass
+            return 1
+
+    def _on_pan_start(self, event):
+        # A plain click (or the first half of a double-click) must not leave the live view
+        self._drag = (event.x, None)
 
-        # Apply tick and spine colors so styling is correct even when there's no data
+    def _on_pan(self, event):
+        if self._drag is None:
+            return
+        x0, end0 = self._drag
+        if end0 is None:
+            if abs(event.x - x0) < self.PAN_THRESHOLD:
+                return
+            self._enter_history()
+            end0 = self._view_end
+            self._drag = (x0, end0)
+        shift = (event.x - x0) * self._view_span / self._graph_width()
+        self._set_view_end(end0 - shift)
+        self._render_history()
+
+    def _on_pan_end(self, event):
+        self._drag = None
+
+    def _on_wheel(self, event):
+        zoom_in = getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0
+        self._enter_history()
+        level = ZOOM_LEVELS.index(self._view_span) + (-1 if zoom_in else 1)
+        if not 0 <= level < len(ZOOM_LEVELS):
+            return
+        # Keep the time under the cursor in place
+        span = ZOOM_LEVELS[level]
+        fraction = min(max(event.x / self._graph_width(), 0.0), 1.0)
+        anchor = self._view_end - self._view_span * (1 - fraction)
+        self._view_span = span
+        self._set_view_end(anchor + span * (1 - fraction))
+        self._render_history()
+
+    def _on_view_live(self, event=None):
+        self._view_span = None
+        self._drag = None
+        self._update_graph(self._last_graph)
+        self.set_status("Live")
+
+    def refresh_history(self):
+        """Redraw the panned view once the viewport has loaded a missing window."""
+        if self._view_span is not None and not self._suspended:
+            self._render_history()
+
+    def _render_history(self):
+        if self.renderer is None or self.viewport is None:
+            return
+        start, end = self._view_end - self._view_span, self._view_end
+        columns, complete = self.viewport.get(start, self._view_span)
+        fmt = '%b %d %H:%M'
+        label = f"{datetime.fromtimestamp(start).strftime(fmt)} - {datetime.fromtimestamp(end).strftime(fmt)}"
+        if not len(columns):
+            if not complete:
+                # Keep the previous frame until the window arrives rather than flashing an empty graph
+                self.set_status(f"Loading {label}...")
+                return
+            self.set_status(f"No readings {label} (double-click for live)")
+        else:
+            self.set_status(f"{label} (double-click for live)")
+
+        theme = self._graph_theme()
+        scene = None
+        if len(columns):
+            values = np.frombuffer(columns.values, dtype=np.float32)
+            live = len(self._last_graph) and end >= self._last_graph.times[-1]
+            scene = GraphScene(np.frombuffer(columns.times, dtype=np.float64), values, float(values[-1]),
+                               self._last_forecast if live else None,
+                               low=getattr(self.config, 'low_threshold', 70),
+                               high=getattr(self.config, 'high_threshold', 180),
+                               x_range=(start, end), animate=False,
+                               episodes=tuple(e for e in self._all_events() if e.end >= start and e.start <= end))
+        self.renderer.render(scene, theme)
+
+    # -- events --------------------------------------------------------------
+
+    def _build_events_tab(self):
+        tab = self.tabview.tab("Events")
+        tab.grid_columnconfigure(0, weight=1)
+        tab.grid_rowconfigure(1, weight=1)
+
+        header = ctk.CTkFrame(tab, fg_color="transparent")
+        header.grid(row=0, column=0, columnspan=2, sticky="ew", padx=12, pady=(10, 6))
+        header.grid_columnconfigure(1, weight=1)
+        self.events_period_segment = ctk.CTkSegmentedButton(header, values=list(self._EVENT_PERIODS),
+                                                            command=lambda _: self._refresh_events_list())
+        self.events_period_segment.grid(row=0, column=0, sticky="w")
         try:
-            self.ax.tick_params(colors=fg_color)
+            self.events_period_segment.set("30 days")
         except Exception:
             pass
-        for spine in self.ax.spines.values():
-            try:
-                spine.set_color(fg_color)
-            except Exception:
-                pass
-
-        if not graph_points:
-            self.canvas.draw()
+        self.events_summary = ctk.CTkLabel(header, text="", font=ctk.CTkFont(size=12))
+        self.events_summary.grid(row=0, column=1, sticky="e")
+
+        columns = [c[0] for c in self._EVENT_COLUMNS]
+        self.events_tree = ttk.Treeview(tab, columns=columns, show="headings", selectmode="browse",
+                                        style="Events.Treeview")
+        for key, title, width, _ in self._EVENT_COLUMNS:
+            self.events_tree.heading(key, text=title, command=lambda k=key: self._sort_events(k))
+            self.events_tree.column(key, width=width, anchor="w" if key == "start" else "center")
+        self.events_tree.tag_configure(EPISODE_LOW, foreground=graph_theme('dark').low_fill)
+        self.events_tree.tag_configure(EPISODE_HIGH, foreground=graph_theme('dark').high_fill)
+        self.events_tree.grid(row=1, column=0, sticky="nsew", padx=(12, 0), pady=(0, 6))
+        scrollbar = ctk.CTkScrollbar(tab, command=self.events_tree.yview)
+        scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 12), pady=(0, 6))
+        self.events_tree.configure(yscrollcommand=scrollbar.set)
+
+        if self.viewport is not None:
+            self.events_tree.bind("<Double-1>", self._on_event_activate)
+            ctk.CTkLabel(tab, text="Double-click an event to show it on the graph",
+                         font=ctk.CTkFont(size=10)).grid(row=2, column=0, columnspan=2, pady=(0, 6))
+
+    def set_history_events(self, episodes):
+        """Episodes from the stored history, sorted by start; the live tracker adds anything newer."""
+        self._history_events = list(episodes)
+        self._refresh_events_list()
+        if self._view_span is not None and not self._suspended:
+            self._render_history()
+
+    def _all_events(self):
+        stored = self._history_events
+        # The stored list lags the live series by one persist; from its last episode on, the tracker is current
+        cutoff = stored[-1].start if stored else float("-inf")
+        newer = [e for e in self._episodes.episodes if e.start >= cutoff]
+        if not newer:
+            return stored
+        return [e for e in stored if e.start < cutoff] + newer
+
+    def _sort_events(self, key):
+        current, descending = self._events_sort
+        self._events_sort = (key, not descending if key == current else True)
+        self._refresh_events_list()
+
+    def _refresh_events_list(self):
+        if self._suspended:
+            # Rebuilding the tree for a hidden window is wasted work; resuming rebuilds it once
+            self._events_dirty = True
             return
-            
-        times = []
-        values = []
-        for p in graph_points:
-            # accept multiple key variants depending on API payload
-            ts_raw = p.get("Timestamp") or p.get("timestamp") or p.get("FactoryTimestamp")
-            # prefer mg/dL value when available
-            val_raw = p.get("ValueInMgPerDl") or p.get("Value") or p.get("value")
-            if not ts_raw or val_raw is None:
-                continue
-
-            ts_str = str(ts_raw).strip()
-            dt = None
-            # Try a list of known timestamp formats
-            tried = []
-            try:
-                # ISO style first
-                ts_iso = ts_str.split('.')[0].rstrip('Z')
-                dt = datetime.fromisoformat(ts_iso)
-            except Exception:
-                tried.append('iso')
-
-            if dt is None:
-                # Common US format like: 1/27/2026 11:48:33 PM
-                fmts = [
-                    '%m/%d/%Y %I:%M:%S %p',
-                    '%m/%d/%Y %H:%M:%S',
-                    '%Y-%m-%d %H:%M:%S',
-                ]
-                for f in fmts:
-                    try:
-                        dt = datetime.strptime(ts_str, f)
-                        break
-                    except Exception:
-                        tried.append(f)
-
-            if dt is None:
-                continue
-
-            # Ensure numeric value (ValueInMgPerDl is likely already mg/dL int)
-            try:
-                val = float(val_raw)
-            except Exception:
-                continue
-
-            times.append(dt)
-            values.append(val)
-        
-        if times:
-            # Smooth the values for a nicer curve in the UI
-            try:
-                if len(values) > 3:
-                    window = 5 if len(values) >= 5 else 3
-                    kernel = np.ones(window) / window
-                    smooth_vals = np.convolve(values, kernel, mode='same')
-                else:
-                    smooth_vals = values
-            except Exception:
-                smooth_vals = values
-
-            line = self.ax.plot(times, smooth_vals, color=line_color, linewidth=2, antialiased=True)[0]
-            # Place marker on the smoothed value so point and line match visually
-            try:
-                last_y = smooth_vals[-1]
-            except Exception:
-                last_y = values[-1]
-            scatter = self.ax.scatter(times[-1], last_y, color=line_color, s=30)
-            # Animate the line and marker fade-in
-            try:
-                line.set_alpha(0.0)
-                scatter.set_alpha(0.0)
-                self._animate_line(line, scatter)
-            except Exception:
-                pass
-
-            # Format X axis
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-            self.ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
-            self.ax.tick_params(axis='x', rotation=45, labelsize=8)
-
-            # Threshold lines
-            self.ax.axhline(y=180, color='red', linestyle='--', alpha=0.3)
-            self.ax.axhline(y=70, color='red', linestyle='--', alpha=0.3)
-
-            self.ax.set_ylim(40, 300)
-            
-        self.fig.tight_layout()
+        self._events_dirty = False
         try:
-            # Ensure canvas widget background matches figure (convert RGBA to hex)
-            rgba = self.fig.get_facecolor()
-            if isinstance(rgba, tuple) or isinstance(rgba, list):
-                try:
-                    r, g, b, a = rgba
-                    hexc = '#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255))
-                except Exception:
-                    hexc = None
-            else:
-                hexc = None
-
-            if hexc:
-                self.canvas.get_tk_widget().configure(bg=hexc)
+            days = self._EVENT_PERIODS.get(self.events_period_segment.get(), 30)
+        except Exception:
+            days = 30
+        since = time.time() - days * 86400
+        events = [e for e in self._all_events() if e.end >= since]
+        key, descending = self._events_sort
+        sort_key = next(c[3] for c in self._EVENT_COLUMNS if c[0] == key)
+        events.sort(key=sort_key, reverse=descending)
+
+        tree = self.events_tree
+        tree.delete(*tree.get_children())
+        self._event_rows = {}
+        for e in events:
+            low = e.kind == EPISODE_LOW
+            iid = tree.insert("", "end", tags=(e.kind,), values=(
+                "Low" if low else "High",
+                datetime.fromtimestamp(e.start).strftime('%Y-%m-%d %H:%M'),
+                _format_duration(e.duration),
+                f"{int(round(e.extreme))} mg/dL"))
+            self._event_rows[iid] = e
+        for column, title, _, _ in self._EVENT_COLUMNS:
+            arrow = (" \u25bc" if descending else " \u25b2") if column == key else ""
+            tree.heading(column, text=title + arrow)
+
+        lows = [e for e in events if e.kind == EPISODE_LOW]
+        highs = [e for e in events if e.kind != EPISODE_LOW]
+        self.events_summary.configure(
+            text=f"{len(lows)} low ({_format_duration(sum(e.duration for e in lows))}), "
+                 f"{len(highs)} high ({_format_duration(sum(e.duration for e in highs))})")
+
+    def _on_event_activate(self, event=None):
+        episode = self._event_rows.get(self.events_tree.focus())
+        if episode is None or self.viewport is None:
+            return
+        # Frame the episode with some context either side
+        span = next((s for s in ZOOM_LEVELS if s >= 3 * episode.duration), ZOOM_LEVELS[-1])
+        self._view_span = span
+        self._set_view_end(episode.end + (span - episode.duration) / 2)
+        self.tabview.set("Monitor")
+        self._render_history()
+
+    def _style_events_tree(self, light: bool):
+        style = ttk.Style(self)
+        bg, fg, head = ('#f3f3f5', 'black', '#e6e6e6') if light else ('#2b2b2b', 'white', '#3a3a3a')
+        style.configure("Events.Treeview", background=bg, fieldbackground=bg, foreground=fg, borderwidth=0)
+        style.configure("Events.Treeview.Heading", background=head, foreground=fg)
+
+    def set_status(self, text):
+        try:
+            self.status_bar.configure(text=text)
         except Exception:
             pass
-        self.canvas.draw()
 
     def set_loading(self, is_loading):
         if is_loading:
@@ -383,8 +580,170 @@ class DashboardView(ctk.CTkFrame):
         except Exception:
             pass
 
+        # Graph renderer: the native canvas is much lighter on low-end machines
+        self.renderer_segment = ctk.CTkSegmentedButton(settings_tab, values=list(self._RENDERER_LABELS.values()))
+        self.renderer_segment.grid(row=2, column=0, sticky='ew', padx=20, pady=(10, 0))
+        try:
+            self.renderer_segment.set(self._RENDERER_LABELS.get(self.renderer_kind, self._RENDERER_LABELS[RENDERER_MATPLOTLIB]))
+        except Exception:
+            pass
+
         apply_btn = ctk.CTkButton(settings_tab, text="Apply", width=80, command=self._apply_appearance)
-        apply_btn.grid(row=2, column=0, sticky='e', padx=20, pady=16)
+        apply_btn.grid(row=3, column=0, sticky='e', padx=20, pady=16)
+
+        self._build_export_section(settings_tab, row=4)
+        self._build_nightscout_section(settings_tab, row=7)
+        self._build_publish_section(settings_tab, row=9)
+
+    def _selected_renderer(self):
+        try:
+            label = self.renderer_segment.get()
+        except Exception:
+            return self.renderer_kind
+        for kind, text in self._RENDERER_LABELS.items():
+            if text == label:
+                return kind
+        return self.renderer_kind
+
+    def _build_export_section(self, parent, row):
+        lbl = ctk.CTkLabel(parent, text="History", font=ctk.CTkFont(size=16))
+        lbl.grid(row=row, column=0, sticky='w', padx=20, pady=(16, 8))
+
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.grid(row=row + 1, column=0, sticky='ew', padx=20)
+        frame.grid_columnconfigure((0, 1), weight=1)
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        self.export_start_entry = ctk.CTkEntry(frame, placeholder_text="From (YYYY-MM-DD)")
+        self.export_start_entry.grid(row=0, column=0, sticky='ew', padx=(0, 6))
+        self.export_end_entry = ctk.CTkEntry(frame, placeholder_text=f"To (e.g. {today})")
+        self.export_end_entry.grid(row=0, column=1, sticky='ew', padx=(6, 0))
+
+        self.export_format_segment = ctk.CTkSegmentedButton(frame, values=["CSV", "Parquet"])
+        self.export_format_segment.grid(row=1, column=0, sticky='w', pady=10)
+        try:
+            self.export_format_segment.set("CSV")
+        except Exception:
+            pass
+
+        self.export_button = ctk.CTkButton(frame, text="Export...", width=100, command=self._on_export_click)
+        self.export_button.grid(row=1, column=1, sticky='e', pady=10)
+
+        self.import_button = ctk.CTkButton(frame, text="Import LibreView CSV...", width=180,
+                                           fg_color="transparent", border_width=1, command=self._on_import_click)
+        self.import_button.grid(row=2, column=0, columnspan=2, sticky='w')
+
+        self.export_status = ctk.CTkLabel(parent, text="", font=ctk.CTkFont(size=11))
+        self.export_status.grid(row=row + 2, column=0, sticky='w', padx=20)
+
+    def _build_nightscout_section(self, parent, row):
+        lbl = ctk.CTkLabel(parent, text="Nightscout upload", font=ctk.CTkFont(size=16))
+        lbl.grid(row=row, column=0, sticky='w', padx=20, pady=(16, 8))
+
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.grid(row=row + 1, column=0, sticky='ew', padx=20)
+        frame.grid_columnconfigure(0, weight=1)
+
+        self.nightscout_url_entry = ctk.CTkEntry(frame, placeholder_text="https://my-site.herokuapp.com")
+        self.nightscout_url_entry.grid(row=0, column=0, columnspan=2, sticky='ew')
+        self.nightscout_secret_entry = ctk.CTkEntry(frame, placeholder_text="API secret", show="*")
+        self.nightscout_secret_entry.grid(row=1, column=0, sticky='ew', pady=10)
+        if self.config and getattr(self.config, 'nightscout_url', ""):
+            self.nightscout_url_entry.insert(0, self.config.nightscout_url)
+
+        save_btn = ctk.CTkButton(frame, text="Save", width=80, command=self._on_nightscout_save)
+        save_btn.grid(row=1, column=1, sticky='e', padx=(12, 0), pady=10)
+
+    def _on_nightscout_save(self):
+        if not self.on_nightscout:
+            return
+        url = self.nightscout_url_entry.get().strip()
+        if url and not url.startswith(("http://", "https://")):
+            self.set_upload_status("Nightscout URL must start with http:// or https://")
+            return
+        # An empty secret field keeps the stored one
+        self.on_nightscout(url, self.nightscout_secret_entry.get().strip() or None)
+        self.nightscout_secret_entry.delete(0, "end")
+
+    def _build_publish_section(self, parent, row):
+        lbl = ctk.CTkLabel(parent, text="Local sharing", font=ctk.CTkFont(size=16))
+        lbl.grid(row=row, column=0, sticky='w', padx=20, pady=(16, 8))
+
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.grid(row=row + 1, column=0, sticky='ew', padx=20)
+        frame.grid_columnconfigure(1, weight=1)
+
+        # Off by default: any program running as this user could read the readings
+        self.publish_switch = ctk.CTkSwitch(frame, text="Share readings with local apps",
+                                            command=self._on_publish_toggle)
+        self.publish_switch.grid(row=0, column=0, sticky='w')
+        if self.config and getattr(self.config, 'publish_readings', False):
+            self.publish_switch.select()
+        self.publish_status = ctk.CTkLabel(frame, text="", font=ctk.CTkFont(size=11))
+        self.publish_status.grid(row=0, column=1, sticky='e')
+
+    def _on_publish_toggle(self):
+        if self.on_publish:
+            self.on_publish(bool(self.publish_switch.get()))
+
+    def set_publish_status(self, text):
+        try:
+            self.publish_status.configure(text=text)
+        except Exception:
+            pass
+
+    def set_upload_status(self, text):
+        try:
+            self.upload_status.configure(text=text)
+        except Exception:
+            pass
+
+    def _on_export_click(self):
+        if not self.on_export:
+            return
+        start = self.export_start_entry.get().strip() or None
+        end = self.export_end_entry.get().strip() or None
+        for text in (start, end):
+            if text:
+                try:
+                    datetime.strptime(text, '%Y-%m-%d')
+                except ValueError:
+                    self.set_export_progress("Dates must be YYYY-MM-DD")
+                    return
+
+        fmt = (self.export_format_segment.get() or "CSV").lower()
+        ext = ".parquet" if fmt == "parquet" else ".csv"
+        path = filedialog.asksaveasfilename(defaultextension=ext, initialfile=f"glucose-history{ext}",
+                                            filetypes=[(fmt.upper(), f"*{ext}")])
+        if not path:
+            return
+        self.export_button.configure(state="disabled")
+        self.on_export(path, start, end, fmt)
+
+    def _on_import_click(self):
+        if not self.on_import:
+            return
+        path = filedialog.askopenfilename(filetypes=[("LibreView export", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        self.import_button.configure(state="disabled")
+        self.on_import(path)
+
+    def set_import_progress(self, text, finished=False):
+        try:
+            self.export_status.configure(text=text)
+            if finished:
+                self.import_button.configure(state="normal")
+        except Exception:
+            pass
+
+    def set_export_progress(self, text, finished=False):
+        try:
+            self.export_status.configure(text=text)
+            if finished:
+                self.export_button.configure(state="normal")
+        except Exception:
+            pass
 
     def _apply_appearance(self):
         sel = None
@@ -415,19 +774,19 @@ class DashboardView(ctk.CTkFrame):
             except Exception:
                 pass
 
-        # refresh matplotlib theme and redraw
-        try:
-            # update figure facecolor (use slightly off-white for light mode)
-            if mode == 'light':
-                self.fig.patch.set_facecolor('#f3f3f5')
-            else:
-                self.fig.patch.set_facecolor('#2b2b2b')
-        except Exception:
-            pass
+        kind = self._selected_renderer()
+        if kind != self.renderer_kind:
+            try:
+                self._create_renderer(kind)
+                if self.config:
+                    self.config.graph_renderer = kind
+                    self.config.save()
+            except Exception as e:
+                print(f"Error switching graph renderer: {e}")
 
         try:
             # redraw using last known data so the plot updates fully
-            self._update_graph(self._last_graph_points or [])
+            self._update_graph(self._last_graph)
         except Exception:
             pass
 
@@ -457,56 +816,16 @@ class DashboardView(ctk.CTkFrame):
         except Exception:
             pass
 
-    def _animate_line(self, line, scatter, steps=10, delay=30):
-        # fade-in animation by increasing alpha
-        def step(i=0):
-            a = (i + 1) / steps
-            try:
-                line.set_alpha(a)
-            except Exception:
-                pass
-            try:
-                scatter.set_alpha(a)
-            except Exception:
-                pass
-            try:
-                self.canvas.draw_idle()
-            except Exception:
-                pass
-            if i + 1 < steps:
-                try:
-                    self.after(delay, lambda: step(i + 1))
-                except Exception:
-                    pass
-
+    def _sync_graph_bg(self, bg_color):
+        # Ensure CTkFrame and graph widget background match the plot color.
         try:
-            step(0)
+            self.graph_frame.configure(fg_color=bg_color)
+        except Exception:
+            pass
+        try:
+            self.renderer.widget.configure(bg=bg_color)
         except Exception:
             pass
-
-    def _sync_graph_bg(self, bg_color):
-        # Ensure CTkFrame and canvas background match the matplotlib figure color.
-        hexc = None
-        if isinstance(bg_color, str) and bg_color.startswith('#'):
-            hexc = bg_color
-        else:
-            try:
-                rgba = self.fig.get_facecolor()
-                if isinstance(rgba, (tuple, list)) and len(rgba) >= 3:
-                    r, g, b = rgba[0], rgba[1], rgba[2]
-                    hexc = '#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255))
-            except Exception:
-                hexc = None
-
-        if hexc:
-            try:
-                self.graph_frame.configure(fg_color=hexc)
-            except Exception:
-                pass
-            try:
-                self.canvas.get_tk_widget().configure(bg=hexc)
-            except Exception:
-                pass
 
     def _apply_widget_theme(self):
         # adjust widget colors (e.g., logout button) to maintain contrast in light mode
@@ -527,3 +846,7 @@ class DashboardView(ctk.CTkFrame):
             self.logout_button.configure(fg_color=btn_fg, text_color=text_col)
         except Exception:
             pass
+        try:
+            self._style_events_tree(mode.lower() == 'light')
+        except Exception:
+            pass
@@ -0,0 +1,215 @@
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from glucose_data import GlucoseSeries, is_high, is_low
+
+EPISODE_LOW = "low"
+EPISODE_HIGH = "high"
+
+# Defaults for Config.episode_min_minutes / episode_merge_minutes, in seconds
+MIN_DURATION = 15 * 60
+MERGE_GAP = 15 * 60
+# Readings further apart than this end a run; nothing is known about the gap
+MAX_GAP_SECONDS = 30 * 60
+# How far back the events list looks in the stored history
+LOOKBACK = 90 * 24 * 3600
+
+_STATE_LOW, _STATE_HIGH = -1, 1
+
+
+class Episode(NamedTuple):
+    kind: str  # EPISODE_LOW or EPISODE_HIGH
+    start: float  # first reading past the threshold
+    end: float  # last reading past the threshold
+    extreme: float  # nadir for lows, peak for highs
+    readings: int  # readings past the threshold
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class Runs(NamedTuple):
+    """Maximal stretches of readings on one side of the range, as parallel arrays."""
+    state: np.ndarray  # -1 at or below low, +1 at or above high
+    start: np.ndarray
+    end: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    count: np.ndarray
+
+
+def episode_rules(config) -> Tuple[float, float, float, float]:
+    """(low, high, min_duration, merge_gap) from the config, with the defaults above."""
+    return (float(getattr(config, "low_threshold", 70)),
+            float(getattr(config, "high_threshold", 180)),
+            float(getattr(config, "episode_min_minutes", MIN_DURATION / 60)) * 60,
+            float(getattr(config, "episode_merge_minutes", MERGE_GAP / 60)) * 60)
+
+
+def find_runs(times, values, low: float, high: float, max_gap: float = MAX_GAP_SECONDS) -> Runs:
+    """Run-length encode readings into below/in/above-range runs and keep the out-of-range ones."""
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(times):
+        empty = np.empty(0)
+        return Runs(np.empty(0, dtype=np.int8), empty, empty, empty, empty, np.empty(0, dtype=np.int64))
+
+    state = np.where(is_low(values, low), _STATE_LOW, np.where(is_high(values, high), _STATE_HIGH, 0)).astype(np.int8)
+    breaks = np.flatnonzero((state[1:] != state[:-1]) | (np.diff(times) > max_gap)) + 1
+    # Runs tile the readings, so reduceat over the run starts reduces exactly each run
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks, [len(times)])) - 1
+    keep = state[first] != 0
+    return Runs(state[first][keep], times[first][keep], times[last][keep],
+                np.minimum.reduceat(values, first)[keep], np.maximum.reduceat(values, first)[keep],
+                (last - first + 1)[keep])
+
+
+def episodes_from_runs(runs: Runs, min_duration: float = MIN_DURATION, merge_gap: float = MERGE_GAP) -> List[Episode]:
+    """
+    Merge runs of the same kind separated by at most `merge_gap` seconds, then
+    drop episodes shorter than `min_duration`. Sorted by start time.
+    """
+    episodes = []
+    for kind, state, reduce_extreme, extremes in (
+            (EPISODE_LOW, _STATE_LOW, np.minimum, runs.minimum),
+            (EPISODE_HIGH, _STATE_HIGH, np.maximum, runs.maximum)):
+        mask = runs.state == state
+        if not mask.any():
+            continue
+        start, end, extreme, count = runs.start[mask], runs.end[mask], extremes[mask], runs.count[mask]
+        heads = np.flatnonzero(np.concatenate(([True], start[1:] - end[:-1] > merge_gap)))
+        tails = np.concatenate((heads[1:], [len(start)])) - 1
+        merged_start, merged_end = start[heads], end[tails]
+        merged_extreme = reduce_extreme.reduceat(extreme, heads)
+        merged_count = np.add.reduceat(count, heads)
+        for i in np.flatnonzero(merged_end - merged_start >= min_duration).tolist():
+            episodes.append(Episode(kind, float(merged_start[i]), float(merged_end[i]),
+                                    float(merged_extreme[i]), int(merged_count[i])))
+    episodes.sort(key=lambda e: e.start)
+    return episodes
+
+
+def detect_episodes(times, values, low: float, high: float, min_duration: float = MIN_DURATION,
+                    merge_gap: float = MERGE_GAP, max_gap: float = MAX_GAP_SECONDS) -> List[Episode]:
+    return episodes_from_runs(find_runs(times, values, low, high, max_gap), min_duration, merge_gap)
+
+
+class EpisodeIndex:
+    """
+    Out-of-range runs for the whole stored history, kept in memory so the
+    events list can ask for months of episodes in milliseconds.
+
+    The first refresh scans the history once. Later refreshes only rescan from
+    the last run touching the newest reading, and readings inserted into the
+    past (backfill, import) rescan from just before the first changed one.
+    Runs are stored rather than episodes, so min-duration and merge-gap rules
+    can change without a rescan; the thresholds cannot.
+    """
+
+    def __init__(self, history, low: float = 70, high: float = 180, max_gap: float = MAX_GAP_SECONDS):
+        self.history = history
+        self.max_gap = max_gap
+        self._lock = threading.Lock()
+        self._thresholds = (low, high)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._runs = find_runs((), (), 0, 0)
+            self._scanned_until: Optional[float] = None
+
+    def configure(self, low: float, high: float) -> None:
+        if (low, high) != self._thresholds:
+            self._thresholds = (low, high)
+            self.reset()
+
+    def refresh(self, since: Optional[float] = None) -> None:
+        """Index readings stored since the last refresh, or everything from `since` if older readings changed."""
+        with self._lock:
+            runs = self._runs
+            if self._scanned_until is None:
+                rescan = None
+            else:
+                # A run within max_gap of the changed reading may continue across it
+                rescan = self._scanned_until if since is None else min(since - self.max_gap, self._scanned_until)
+                touched = runs.end >= rescan
+                if touched.any():
+                    rescan = min(rescan, float(runs.start[touched].min()))
+                runs = Runs(*(col[~touched] for col in runs))
+            columns = self.history.query(rescan)
+            if not len(columns):
+                return
+            times = np.frombuffer(columns.times, dtype=np.float64)
+            tail = find_runs(times, np.frombuffer(columns.values, dtype=np.float32), *self._thresholds, self.max_gap)
+            self._runs = Runs(*(np.concatenate(cols) for cols in zip(runs, tail)))
+            self._scanned_until = float(times[-1])
+
+    def episodes(self, start: float, end: float, min_duration: float = MIN_DURATION,
+                 merge_gap: float = MERGE_GAP) -> List[Episode]:
+        with self._lock:
+            runs = self._runs
+        lo = int(np.searchsorted(runs.end, start - merge_gap, side="left"))
+        hi = int(np.searchsorted(runs.start, end, side="right"))
+        return episodes_from_runs(Runs(*(col[lo:hi] for col in runs)), min_duration, merge_gap)
+
+
+class EpisodeTracker:
+    """
+    Episodes over the live series, kept up to date as readings arrive.
+
+    Each sync only re-examines the tail that new readings can still change:
+    episodes still open (within merge_gap of the newest reading) and anything
+    that could yet grow into one. Closed episodes are kept as they are and
+    dropped once they scroll out of the series.
+    """
+
+    def __init__(self, low: float = 70, high: float = 180, min_duration: float = MIN_DURATION,
+                 merge_gap: float = MERGE_GAP):
+        self._rules = (low, high, min_duration, merge_gap)
+        self.reset()
+
+    def reset(self) -> None:
+        self.episodes: List[Episode] = []
+        self.since: Optional[float] = None  # oldest reading the episodes cover
+        self._resume: Optional[float] = None
+        self._total = 0
+
+    def configure(self, low: float, high: float, min_duration: float, merge_gap: float) -> None:
+        if (low, high, min_duration, merge_gap) != self._rules:
+            self._rules = (low, high, min_duration, merge_gap)
+            self.reset()
+
+    def sync(self, series: GlucoseSeries) -> bool:
+        """Bring the episodes up to date with `series`; returns whether they changed."""
+        if not len(series):
+            return False
+        if series.total < self._total:
+            # A new series (e.g. after logout) rather than more readings
+            self.reset()
+        if series.total == self._total:
+            return False
+        self._total = series.total
+
+        low, high, min_duration, merge_gap = self._rules
+        columns = series.columns(since=self._resume)
+        times = np.frombuffer(columns.times, dtype=np.float64)
+        fresh = detect_episodes(times, np.frombuffer(columns.values, dtype=np.float32), low, high,
+                                min_duration, merge_gap)
+        self.since = series[0].timestamp
+        kept = [e for e in self.episodes
+                if self._resume is not None and self.since <= e.end < self._resume]
+        episodes = kept + fresh
+        changed = episodes != self.episodes
+        self.episodes = episodes
+
+        # An unqualified run still growing started after this; any episode reaching past it is recomputed whole
+        resume = times[-1] - merge_gap - min_duration if len(times) else self._resume
+        for e in self.episodes:
+            if e.end >= resume:
+                resume = min(resume, e.start)
+        self._resume = resume
+        return changed
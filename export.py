@@ -0,0 +1,152 @@
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from glucose_data import FLAG_COLOR_MASK, FLAG_HIGH, FLAG_LOW
+from history import HistoryStore
+
+FORMATS = ("csv", "parquet")
+CSV_HEADER = ["timestamp", "epoch", "glucose_mg_dl", "color", "is_high", "is_low"]
+
+
+def parse_date(text: str, end: bool = False) -> float:
+    """Local YYYY-MM-DD to epoch seconds; with `end`, the start of the following day (exclusive bound)."""
+    day = datetime.strptime(text.strip(), "%Y-%m-%d")
+    if end:
+        day += timedelta(days=1)
+    return day.timestamp()
+
+
+def format_from_path(path: str) -> str:
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def export_history(store: HistoryStore, path: str, start: Optional[float] = None, end: Optional[float] = None,
+                   fmt: Optional[str] = None, chunk_size: int = HistoryStore.CHUNK_SIZE,
+                   progress: Optional[Callable[[int, int], None]] = None, token=None) -> int:
+    """
+    Stream readings in [start, end) to `path` chunk by chunk and return the row count.
+    `progress(done, total)` is called after each chunk; a cancelled `token`
+    stops the export.
+
+    The file is written as `path + ".part"` and only renamed over `path` once
+    complete, so a failed or cancelled export never leaves a truncated file
+    (or clobbers an earlier export) under the requested name.
+    """
+    fmt = (fmt or format_from_path(path)).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    total = store.count(start, end)
+    part = path + ".part"
+    writer = _ParquetWriter(part) if fmt == "parquet" else _CsvWriter(part)
+    done = 0
+    complete = False
+    try:
+        try:
+            for chunk in store.iter_chunks(start, end, chunk_size):
+                if token is not None and token.cancelled:
+                    break
+                writer.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+        finally:
+            writer.close()
+        complete = token is None or not token.cancelled
+        if complete:
+            os.replace(part, path)
+    finally:
+        if not complete:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+    return done
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+
+    def write(self, chunk) -> None:
+        self._writer.writerows(
+            (datetime.fromtimestamp(t).isoformat(), int(t), round(v, 1), f & FLAG_COLOR_MASK,
+             int(bool(f & FLAG_HIGH)), int(bool(f & FLAG_LOW)))
+            for t, v, f in zip(chunk.times, chunk.values, chunk.flags)
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Writes each chunk as its own row group, so only one chunk is ever held in memory."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires the optional 'pyarrow' package")
+        self._pa = pa
+        self._schema = pa.schema([
+            ("timestamp", pa.timestamp("s", tz="UTC")),
+            ("glucose_mg_dl", pa.float32()),
+            ("color", pa.uint8()),
+            ("is_high", pa.bool_()),
+            ("is_low", pa.bool_()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, chunk) -> None:
+        import numpy as np
+
+        pa = self._pa
+        flags = np.frombuffer(chunk.flags, dtype=np.uint8)
+        table = pa.Table.from_arrays([
+            pa.array(np.frombuffer(chunk.times, dtype=np.float64).astype("int64"), pa.int64()).cast(
+                self._schema.field("timestamp").type),
+            pa.array(np.frombuffer(chunk.values, dtype=np.float32)),
+            pa.array(flags & FLAG_COLOR_MASK),
+            pa.array((flags & FLAG_HIGH) != 0),
+            pa.array((flags & FLAG_LOW) != 0),
+        ], schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export LibreView Monitor history to CSV or Parquet.")
+    parser.add_argument("output", help="output file (.csv or .parquet)")
+    parser.add_argument("--start", help="first day to export, YYYY-MM-DD (default: beginning)")
+    parser.add_argument("--end", help="last day to export, YYYY-MM-DD, inclusive (default: latest reading)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from file extension)")
+    parser.add_argument("--db", default=None, help="history database (default: the logged-in account's)")
+    args = parser.parse_args(argv)
+
+    start = parse_date(args.start) if args.start else None
+    end = parse_date(args.end, end=True) if args.end else None
+    store = HistoryStore(args.db or HistoryStore.default_path())
+
+    def report(done, total):
+        pct = 100 * done // total if total else 100
+        print(f"\rExported {done}/{total} readings ({pct}%)", end="", file=sys.stderr)
+
+    try:
+        rows = export_history(store, args.output, start, end, args.format, progress=report)
+    finally:
+        store.close()
+    print(f"\nWrote {rows} readings to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from glucose_data import GlucoseSeries
+
+DEFAULT_HORIZON_MINUTES = 30
+# Readings further apart than this restart the filter instead of bridging the gap
+MAX_GAP_MINUTES = 60
+
+
+class Forecast(NamedTuple):
+    times: np.ndarray  # epoch seconds, starting at the latest reading
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    slope: float  # mg/dL per minute
+
+
+def trend_from_slope(slope: Optional[float]) -> Optional[int]:
+    """Map a rate of change onto LibreView's 1-5 TrendArrow scale."""
+    if slope is None:
+        return None
+    if slope <= -2:
+        return 1
+    if slope <= -1:
+        return 2
+    if slope < 1:
+        return 3
+    if slope < 2:
+        return 4
+    return 5
+
+
+class GlucoseForecaster:
+    """
+    Local linear trend Kalman filter over the glucose series.
+
+    The state is (level, slope) with slope in mg/dL per minute. Each reading
+    is folded in with one predict/update step, so keeping the filter current
+    costs O(1) per new reading; forecasts for all horizons are evaluated in a
+    single vectorized pass over the state covariance.
+    """
+
+    def __init__(self, accel_noise: float = 0.01, measurement_noise: float = 16.0):
+        # accel_noise: variance of the slope drift per minute ((mg/dL/min)^2 / min)
+        # measurement_noise: sensor noise variance ((mg/dL)^2)
+        self.q = accel_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def reset(self) -> None:
+        self.x = None
+        self.P = None
+        self.last_time = None
+        self._seen = 0
+
+    def _process_noise(self, dt: float) -> np.ndarray:
+        return self.q * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+
+    def update(self, timestamp: float, value: float) -> None:
+        if self.last_time is not None and timestamp <= self.last_time:
+            return
+        if self.x is None or (timestamp - self.last_time) / 60 > MAX_GAP_MINUTES:
+            self.x = np.array([value, 0.0])
+            self.P = np.diag([self.r, 1.0])
+            self.last_time = timestamp
+            return
+
+        dt = (timestamp - self.last_time) / 60
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        x = F @ self.x
+        P = F @ self.P @ F.T + self._process_noise(dt)
+
+        # Scalar measurement of the level: H = [1, 0]
+        innovation = value - x[0]
+        s = P[0, 0] + self.r
+        k = P[:, 0] / s
+        self.x = x + k * innovation
+        self.P = P - np.outer(k, P[0, :])
+        self.last_time = timestamp
+
+    def sync(self, series: GlucoseSeries) -> int:
+        """Fold in readings appended to `series` since the last call; returns how many were used."""
+        new = series.total - self._seen
+        if new == 0:
+            return 0
+        if new < 0 or new > len(series):
+            # Series was cleared or wrapped past unseen rows; rebuild from what is left
+            self.reset()
+            new = len(series)
+        for index in range(len(series) - new, len(series)):
+            reading = series[index]
+            self.update(reading.timestamp, reading.value)
+        self._seen = series.total
+        return new
+
+    @property
+    def slope(self) -> Optional[float]:
+        return None if self.x is None else float(self.x[1])
+
+    def trend(self) -> Optional[int]:
+        return trend_from_slope(self.slope)
+
+    def forecast(self, horizon_minutes: float = DEFAULT_HORIZON_MINUTES, step_minutes: float = 1.0,
+                 z: float = 1.64) -> Optional[Forecast]:
+        """Project the level forward with a +/- z standard deviation band (90% by default)."""
+        if self.x is None:
+            return None
+        h = np.arange(0.0, horizon_minutes + step_minutes, step_minutes)
+        level, slope = self.x
+        mean = level + slope * h
+        P = self.P
+        var = P[0, 0] + 2 * h * P[0, 1] + h * h * P[1, 1] + self.q * h ** 3 / 3
+        std = np.sqrt(np.maximum(var, 0.0))
+        times = self.last_time + h * 60
+        return Forecast(times, mean, mean - z * std, mean + z * std, float(slope))
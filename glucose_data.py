@@ -0,0 +1,382 @@
+import bisect
+import json
+import threading
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Prefer orjson when it is installed; it parses the /graph payload several
+# times faster than the stdlib and accepts bytes directly.
+try:
+    import orjson as _fast_json
+except ImportError:
+    _fast_json = None
+
+# Per-reading flag bits. The low two bits carry LibreView's MeasurementColor
+# (1: in range, 2: elevated, 3: low/high alarm) so the tray and dashboard do
+# not need a second column for it.
+FLAG_COLOR_MASK = 0x03
+FLAG_HIGH = 0x04
+FLAG_LOW = 0x08
+
+# Timestamp formats seen in LibreView payloads, tried after ISO parsing
+TIMESTAMP_FORMATS = [
+    '%m/%d/%Y %I:%M:%S %p',  # 1/27/2026 11:48:33 PM
+    '%m/%d/%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+]
+
+
+def is_low(value, low):
+    """Whether `value` (a number or numpy array) is at or below the low threshold; alerts and episodes share this."""
+    return value <= low
+
+
+def is_high(value, high):
+    """Whether `value` (a number or numpy array) is at or above the high threshold."""
+    return value >= high
+
+
+def loads(raw) -> Any:
+    """Parse a JSON document from bytes or str using the fastest available parser."""
+    if _fast_json is not None:
+        return _fast_json.loads(raw)
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode('utf-8')
+    return json.loads(raw)
+
+
+class TimestampParser:
+    """
+    Parses LibreView timestamps to epoch seconds.
+    All points in a payload share one format, so the format that matched last
+    is tried first and the rest of the list is only walked on a miss.
+    """
+
+    def __init__(self, formats: Optional[List[str]] = None):
+        self.formats = list(formats or TIMESTAMP_FORMATS)
+        self._last_format = None
+
+    def parse(self, ts_raw) -> Optional[float]:
+        if not ts_raw:
+            return None
+        ts_str = str(ts_raw).strip()
+
+        if self._last_format is not None:
+            try:
+                return self._to_epoch(ts_str, self._last_format)
+            except ValueError:
+                self._last_format = None
+
+        try:
+            # ISO style first
+            ts_iso = ts_str.split('.')[0].rstrip('Z')
+            return datetime.fromisoformat(ts_iso).timestamp()
+        except ValueError:
+            pass
+
+        for f in self.formats:
+            try:
+                epoch = self._to_epoch(ts_str, f)
+            except ValueError:
+                continue
+            self._last_format = f
+            return epoch
+        return None
+
+    @staticmethod
+    def _to_epoch(ts_str: str, fmt: str) -> float:
+        return datetime.strptime(ts_str, fmt).timestamp()
+
+
+def point_flags(point: dict) -> int:
+    flags = int(point.get("MeasurementColor") or 0) & FLAG_COLOR_MASK
+    if point.get("isHigh"):
+        flags |= FLAG_HIGH
+    if point.get("isLow"):
+        flags |= FLAG_LOW
+    return flags
+
+
+class GraphColumns(NamedTuple):
+    """Columnar view of a /graph payload: epoch seconds, mg/dL values and flag bits."""
+    times: array
+    values: array
+    flags: array
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class CurrentMeasurement(NamedTuple):
+    value: Optional[float]
+    trend: Optional[int]
+    timestamp: Optional[float]
+    color: int
+
+
+class GlucoseData(NamedTuple):
+    current: CurrentMeasurement
+    graph: GraphColumns
+
+
+def empty_columns() -> GraphColumns:
+    return GraphColumns(array('d'), array('f'), array('B'))
+
+
+def decode_graph(points: Iterable[dict], parser: Optional[TimestampParser] = None) -> GraphColumns:
+    """Decode a graphData list into columns in a single pass, skipping unusable points."""
+    parser = parser or TimestampParser()
+    columns = empty_columns()
+    times, values, flags = columns
+    for p in points or ():
+        # accept multiple key variants depending on API payload
+        ts = parser.parse(p.get("Timestamp") or p.get("timestamp") or p.get("FactoryTimestamp"))
+        # prefer mg/dL value when available
+        val_raw = p.get("ValueInMgPerDl") or p.get("Value") or p.get("value")
+        if ts is None or val_raw is None:
+            continue
+        try:
+            val = float(val_raw)
+        except (TypeError, ValueError):
+            continue
+        times.append(ts)
+        values.append(val)
+        flags.append(point_flags(p))
+    return columns
+
+
+def decode_graph_response(raw) -> GlucoseData:
+    """Decode a raw /graph response body into the current measurement and graph columns."""
+    data = loads(raw).get("data") or {}
+    connection = data.get("connection") or {}
+    measurement = connection.get("glucoseMeasurement") or {}
+    parser = TimestampParser()
+
+    value = measurement.get("ValueInMgPerDl") or measurement.get("Value")
+    try:
+        value = float(value) if value is not None else None
+    except (TypeError, ValueError):
+        value = None
+
+    current = CurrentMeasurement(
+        value=value,
+        trend=measurement.get("TrendArrow"),
+        timestamp=parser.parse(measurement.get("Timestamp")),
+        color=int(measurement.get("MeasurementColor") or 1),
+    )
+    return GlucoseData(current, decode_graph(data.get("graphData") or [], parser))
+
+
+class Reading:
+    """A single reading copied out of a GlucoseSeries row."""
+    __slots__ = ("timestamp", "value", "flags", "trend")
+
+    def __init__(self, timestamp: float, value: float, flags: int = 0, trend: int = 0):
+        self.timestamp = timestamp
+        self.value = value
+        self.flags = flags
+        self.trend = trend
+
+    @property
+    def color(self) -> int:
+        return (self.flags & FLAG_COLOR_MASK) or 1
+
+    @property
+    def is_high(self) -> bool:
+        return bool(self.flags & FLAG_HIGH)
+
+    @property
+    def is_low(self) -> bool:
+        return bool(self.flags & FLAG_LOW)
+
+    def __repr__(self) -> str:
+        return f"Reading(timestamp={self.timestamp}, value={self.value}, flags={self.flags}, trend={self.trend})"
+
+
+class GlucoseSeries:
+    """
+    Fixed-capacity ring of readings stored as typed array columns
+    (8 + 4 + 1 + 1 = 14 bytes per reading). Readings are kept in timestamp
+    order; appending writes one slot in place and evicts the oldest reading
+    once the ring is full, so the series is never copied on append.
+
+    The ring only grows at the end, because consumers (smoothing, forecast,
+    episodes) follow it by `total`. A reading older than the latest one is
+    kept aside instead and handed out once by drain_late(), so it still
+    reaches the history and the mirrors. The poll thread writes while Tk
+    callbacks and background tasks read, so every access takes the lock.
+    """
+    __slots__ = ("capacity", "_times", "_values", "_flags", "_trends", "_start", "_size", "total", "_late", "_lock")
+
+    DEFAULT_CAPACITY = 1440  # 24 hours of 1-minute readings
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = array('d', [0.0]) * capacity
+        self._values = array('f', [0.0]) * capacity
+        self._flags = array('B', [0]) * capacity
+        self._trends = array('b', [0]) * capacity
+        self._start = 0
+        self._size = 0
+        # Number of readings ever appended; lets consumers pick up only new rows
+        self.total = 0
+        self._late: Dict[float, Tuple[float, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def _slot(self, index: int) -> int:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("GlucoseSeries index out of range")
+        return (self._start + index) % self.capacity
+
+    def __getitem__(self, index: int) -> Reading:
+        with self._lock:
+            i = self._slot(index)
+            return Reading(self._times[i], self._values[i], self._flags[i], self._trends[i])
+
+    def __iter__(self):
+        with self._lock:
+            readings = [self[index] for index in range(self._size)]
+        return iter(readings)
+
+    @property
+    def latest(self) -> Optional[Reading]:
+        with self._lock:
+            return self[-1] if self._size else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self._times, self._values, self._flags, self._trends))
+
+    def append(self, timestamp: float, value: float, flags: int = 0, trend: int = 0) -> bool:
+        """
+        Append a reading newer than the latest one; returns False for duplicates
+        and older readings. Older readings not already in the ring are kept for drain_late().
+        """
+        with self._lock:
+            return self._append(timestamp, value, flags, trend)
+
+    def _append(self, timestamp: float, value: float, flags: int, trend: int) -> bool:
+        if self._size:
+            last = (self._start + self._size - 1) % self.capacity
+            last_ts = self._times[last]
+            if timestamp < last_ts:
+                if not self._contains(timestamp) and len(self._late) < self.capacity:
+                    self._late[timestamp] = (value, flags)
+                return False
+            if timestamp == last_ts:
+                # Same reading seen again, e.g. the current measurement also
+                # present in graphData; keep the richer metadata.
+                self._flags[last] = flags or self._flags[last]
+                self._trends[last] = trend or self._trends[last]
+                return False
+
+        if self._size < self.capacity:
+            i = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[i] = timestamp
+        self._values[i] = value
+        self._flags[i] = flags
+        self._trends[i] = trend
+        self.total += 1
+        return True
+
+    def _contains(self, timestamp: float) -> bool:
+        # Binary search over the ring in logical (timestamp) order
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = self._times[(self._start + mid) % self.capacity]
+            if t == timestamp:
+                return True
+            if t < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def extend(self, columns: GraphColumns) -> int:
+        added = 0
+        with self._lock:
+            for ts, val, flags in zip(columns.times, columns.values, columns.flags):
+                added += self._append(ts, val, flags, 0)
+        return added
+
+    def update(self, data: GlucoseData) -> int:
+        """Merge a decoded /graph response; returns the number of new readings."""
+        rows = list(zip(data.graph.times, data.graph.values, data.graph.flags, [0] * len(data.graph)))
+        current = data.current
+        if current.value is not None and current.timestamp is not None:
+            rows.append((current.timestamp, current.value, current.color & FLAG_COLOR_MASK, int(current.trend or 0)))
+        # The current measurement can be newer than graph points in the same response
+        rows.sort(key=lambda row: row[0])
+        with self._lock:
+            return sum(self._append(*row) for row in rows)
+
+    def drain_late(self) -> GraphColumns:
+        """Readings that arrived older than the latest one since the last call, in timestamp order."""
+        with self._lock:
+            late, self._late = self._late, {}
+        out = empty_columns()
+        for ts in sorted(late):
+            value, flags = late[ts]
+            out.times.append(ts)
+            out.values.append(value)
+            out.flags.append(flags)
+        return out
+
+    def columns(self, since: Optional[float] = None) -> GraphColumns:
+        """Return the readings in timestamp order as contiguous columns, optionally from `since` onwards."""
+        out = empty_columns()
+        with self._lock:
+            first = self._start
+            end = self._start + self._size
+            for lo, hi in ((first, min(end, self.capacity)), (0, max(0, end - self.capacity))):
+                out.times.extend(self._times[lo:hi])
+                out.values.extend(self._values[lo:hi])
+                out.flags.extend(self._flags[lo:hi])
+        if since is not None:
+            cut = bisect.bisect_left(out.times, since)
+            if cut:
+                out = GraphColumns(out.times[cut:], out.values[cut:], out.flags[cut:])
+        return out
+
+    def rate_of_change(self, window: float = 15 * 60) -> Optional[float]:
+        """Least-squares slope in mg/dL per minute over readings within `window` seconds of the latest."""
+        with self._lock:
+            if self._size < 2:
+                return None
+            t_end = self[-1].timestamp
+            n = 0
+            sum_t = sum_v = sum_tt = sum_tv = 0.0
+            for index in range(self._size - 1, -1, -1):
+                i = (self._start + index) % self.capacity
+                t = self._times[i] - t_end
+                if t < -window:
+                    break
+                v = self._values[i]
+                n += 1
+                sum_t += t
+                sum_v += v
+                sum_tt += t * t
+                sum_tv += t * v
+        denom = n * sum_tt - sum_t * sum_t
+        if n < 2 or denom == 0:
+            return None
+        return (n * sum_tv - sum_t * sum_v) / denom * 60.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._start = 0
+            self._size = 0
+            self.total = 0
+            self._late.clear()
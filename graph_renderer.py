@@ -0,0 +1,536 @@
+import time
+import tkinter as tk
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from episodes import EPISODE_LOW, Episode
+from forecast import Forecast
+
+# Config values for `graph_renderer`
+RENDERER_MATPLOTLIB = "matplotlib"
+RENDERER_CANVAS = "canvas"
+RENDERERS = (RENDERER_MATPLOTLIB, RENDERER_CANVAS)
+
+Y_MIN, Y_MAX = 40, 300
+DAY = 86400
+
+
+class GraphTheme(NamedTuple):
+    bg: str
+    fg: str
+    line: str
+    threshold: str = '#ff0000'
+    low_fill: str = '#e74c3c'
+    high_fill: str = '#f39c12'
+
+
+class GraphScene(NamedTuple):
+    """Everything a renderer needs for one frame; values are already smoothed."""
+    times: np.ndarray  # epoch seconds
+    values: np.ndarray
+    last_value: float  # raw latest measurement, where the marker sits
+    forecast: Optional[Forecast] = None
+    low: float = 70
+    high: float = 180
+    x_range: Optional[Tuple[float, float]] = None  # fixed epoch window while panning; else fit the data
+    animate: bool = True
+    episodes: Sequence[Episode] = ()  # shaded behind the series
+
+
+def graph_theme(appearance: str) -> GraphTheme:
+    # treat 'system' as 'dark' to avoid automatic white backgrounds
+    if (appearance or 'dark').lower() == 'light':
+        return GraphTheme(bg='#f3f3f5', fg='black', line='#1f77b4')
+    return GraphTheme(bg='#2b2b2b', fg='white', line='#3498db')
+
+
+def _local_offset(epoch: float) -> float:
+    try:
+        return datetime.fromtimestamp(epoch).astimezone().utcoffset().total_seconds()
+    except Exception:
+        return 0
+
+
+def _local_offsets(times) -> np.ndarray:
+    """
+    UTC offset in seconds for each epoch timestamp. The offset is sampled once
+    a day across the range and each change is bisected to the second, so a
+    range spanning a DST switch gets the right offset on both sides.
+    """
+    epoch = np.asarray(times, dtype=np.float64)
+    if not len(epoch):
+        return np.zeros(0)
+    lo, hi = int(epoch.min()), int(np.ceil(epoch.max()))
+    samples = list(range(lo, hi, DAY)) + [hi]
+    offsets = [_local_offset(t) for t in samples]
+    starts, values = [], [offsets[0]]
+    for a, b, before, after in zip(samples, samples[1:], offsets, offsets[1:]):
+        if before == after:
+            continue
+        while b - a > 1:
+            mid = (a + b) // 2
+            if _local_offset(mid) == before:
+                a = mid
+            else:
+                b = mid
+        starts.append(b)
+        values.append(after)
+    return np.asarray(values)[np.searchsorted(starts, epoch, side='right')]
+
+
+def _tick_step(span: float, width: float, spacing: float) -> Tuple[int, str]:
+    """Seconds between x labels and their format: whole hours up to a day and a half, whole days beyond."""
+    hours = max(1, int(np.ceil(span / 3600 * spacing / max(width, 1))))
+    if span <= 36 * 3600 and hours < 24:
+        return hours * 3600, '%H:%M'
+    return int(np.ceil(hours / 24)) * 86400, '%b %d'
+
+
+def _span_fill(episode: Episode, theme: GraphTheme) -> str:
+    return theme.low_fill if episode.kind == EPISODE_LOW else theme.high_fill
+
+
+def _local_datetimes(times):
+    # Convert epoch seconds to naive local datetime64, vectorized per offset segment
+    epoch = np.asarray(times, dtype=np.float64)
+    return (epoch + _local_offsets(epoch)).astype('datetime64[s]')
+
+
+class GraphRenderer:
+    """
+    Draws the dashboard graph into one Tk widget owned by the renderer.
+    Implementations keep whatever they need to redraw cheaply between frames.
+    """
+
+    def __init__(self, master):
+        self.master = master
+
+    @property
+    def widget(self) -> tk.Widget:
+        raise NotImplementedError
+
+    def render(self, scene: Optional[GraphScene], theme: GraphTheme) -> None:
+        raise NotImplementedError
+
+    def artist_count(self) -> int:
+        """Number of drawable items; must stay flat however many frames are rendered."""
+        raise NotImplementedError
+
+    def destroy(self) -> None:
+        try:
+            self.widget.destroy()
+        except Exception:
+            pass
+
+
+class MatplotlibRenderer(GraphRenderer):
+    """
+    Full matplotlib figure; heavier, but with proper axes and the fade-in animation.
+
+    The figure is a plain matplotlib.figure.Figure, not a pyplot one, so no
+    global figure manager keeps it alive after the dashboard is destroyed.
+    Artists are created once and updated in place, and at most one fade
+    callback is ever pending.
+    """
+    FADE_STEPS = 10
+    FADE_DELAY = 30
+    MIN_TICK_SPACING = 60  # pixels between x labels while panning
+
+    def __init__(self, master):
+        super().__init__(master)
+        # Imported here so the canvas renderer never pays for matplotlib
+        import matplotlib.dates as mdates
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.collections import PolyCollection
+        from matplotlib.figure import Figure
+
+        self._mdates = mdates
+        self.fig = Figure(figsize=(6, 3), dpi=100, tight_layout=True)
+        self.ax = self.fig.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self._fade_after = None
+        self._ticks = None
+
+        ax = self.ax
+        ax.xaxis_date()
+        self._set_ticks(3600, '%H:%M')
+        ax.tick_params(axis='x', rotation=45, labelsize=8)
+        ax.set_ylim(Y_MIN, Y_MAX)
+        self._high = ax.axhline(y=180, linestyle='--', alpha=0.3)
+        self._low = ax.axhline(y=70, linestyle='--', alpha=0.3)
+        self._band = None
+        # Every episode span lives in one collection, updated in place
+        self._spans = PolyCollection([], linewidths=0, alpha=0.15, zorder=0.5)
+        ax.add_collection(self._spans, autolim=False)
+        self._forecast = ax.plot([], [], linewidth=1.5, linestyle='--', alpha=0.8)[0]
+        self._line = ax.plot([], [], linewidth=2, antialiased=True)[0]
+        self._marker = ax.scatter([], [], s=30)
+
+    @property
+    def widget(self) -> tk.Widget:
+        return self.canvas.get_tk_widget()
+
+    def render(self, scene: Optional[GraphScene], theme: GraphTheme) -> None:
+        ax = self.ax
+        self.fig.patch.set_facecolor(theme.bg)
+        ax.set_facecolor(theme.bg)
+        ax.tick_params(colors=theme.fg)
+        for spine in ax.spines.values():
+            spine.set_color(theme.fg)
+        for artist in (self._line, self._forecast, self._marker):
+            artist.set_color(theme.line)
+        for artist in (self._high, self._low):
+            artist.set_color(theme.threshold)
+        if self._band is not None:
+            self._band.remove()
+            self._band = None
+
+        has_data = scene is not None and len(scene.times) > 0
+        for artist in (self._line, self._marker, self._forecast, self._high, self._low, self._spans):
+            artist.set_visible(has_data)
+        if not has_data:
+            self._cancel_fade()
+            self.canvas.draw_idle()
+            return
+
+        date2num = self._mdates.date2num
+        times = date2num(_local_datetimes(scene.times))
+        self._line.set_data(times, scene.values)
+        # Marker sits on the latest measurement, which the smoothed line ends at
+        self._marker.set_offsets([[times[-1], scene.last_value]])
+        self._high.set_ydata([scene.high, scene.high])
+        self._low.set_ydata([scene.low, scene.low])
+        if scene.episodes:
+            edges = date2num(_local_datetimes([t for e in scene.episodes for t in (e.start, e.end)])).reshape(-1, 2)
+            self._spans.set_verts([[(x0, Y_MIN), (x0, Y_MAX), (x1, Y_MAX), (x1, Y_MIN)]
+                                   for x0, x1 in edges.tolist()])
+            self._spans.set_facecolors([_span_fill(e, theme) for e in scene.episodes])
+        else:
+            self._spans.set_verts([])
+
+        # Short-horizon projection with its confidence band
+        x_end = times[-1]
+        forecast = scene.forecast
+        if forecast is not None and len(forecast.times):
+            f_times = date2num(_local_datetimes(forecast.times))
+            self._band = ax.fill_between(f_times, forecast.lower, forecast.upper,
+                                         color=theme.line, alpha=0.15, linewidth=0)
+            self._forecast.set_data(f_times, forecast.mean)
+            x_end = f_times[-1]
+        else:
+            self._forecast.set_data([], [])
+        if scene.x_range is not None:
+            # Panned or zoomed: the window is fixed and the data is clipped to it
+            start, end = scene.x_range
+            ax.set_xlim(*date2num(_local_datetimes([start, end])))
+            self._set_ticks(*_tick_step(end - start, self._axes_width(), self.MIN_TICK_SPACING))
+        else:
+            ax.set_xlim(times[0], max(x_end, times[0] + 1 / 24))
+            self._set_ticks(3600, '%H:%M')
+
+        if not scene.animate:
+            # Dragging renders many frames a second; a fade would only flicker
+            self._cancel_fade()
+            self._line.set_alpha(1.0)
+            self._marker.set_alpha(1.0)
+            self.canvas.draw_idle()
+            return
+
+        # Animate the line and marker fade-in
+        self._line.set_alpha(0.0)
+        self._marker.set_alpha(0.0)
+        self._animate_line()
+
+    def _axes_width(self) -> float:
+        try:
+            return self.ax.get_window_extent().width
+        except Exception:
+            return 0
+
+    def _set_ticks(self, step: int, fmt: str):
+        if self._ticks == (step, fmt):
+            return
+        self._ticks = (step, fmt)
+        mdates = self._mdates
+        if step < 86400:
+            locator = mdates.HourLocator(interval=step // 3600)
+        else:
+            locator = mdates.DayLocator(interval=step // 86400)
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter(fmt))
+
+    def _animate_line(self, i=0):
+        # fade-in animation by increasing alpha; a new render restarts it
+        self._cancel_fade()
+        a = (i + 1) / self.FADE_STEPS
+        self._line.set_alpha(a)
+        self._marker.set_alpha(a)
+        try:
+            self.canvas.draw_idle()
+        except Exception:
+            pass
+        if i + 1 < self.FADE_STEPS:
+            try:
+                self._fade_after = self.widget.after(self.FADE_DELAY, self._animate_line, i + 1)
+            except Exception:
+                pass
+
+    def _cancel_fade(self):
+        if self._fade_after is not None:
+            try:
+                self.widget.after_cancel(self._fade_after)
+            except Exception:
+                pass
+            self._fade_after = None
+
+    def artist_count(self) -> int:
+        return len(self.ax.get_children()) + len(self.fig.get_children())
+
+    def destroy(self) -> None:
+        self._cancel_fade()
+        super().destroy()
+        # Drop every artist so nothing keeps the figure's data alive
+        self.fig.clear()
+
+
+def _blend(color: str, bg: str, alpha: float) -> str:
+    """Tk has no alpha channel; pre-mix `color` over `bg` instead."""
+    def rgb(c):
+        c = c.lstrip('#')
+        return [int(c[i:i + 2], 16) for i in (0, 2, 4)]
+    try:
+        fg_rgb, bg_rgb = rgb(color), rgb(bg)
+    except ValueError:
+        return color
+    return '#%02x%02x%02x' % tuple(int(round(f * alpha + b * (1 - alpha))) for f, b in zip(fg_rgb, bg_rgb))
+
+
+class CanvasRenderer(GraphRenderer):
+    """
+    Native tkinter.Canvas renderer for low-end machines.
+
+    Every item (series line, marker, forecast band and mean, thresholds, axes,
+    tick labels) is created once. A frame maps the data to pixel coordinates
+    with numpy and only touches items whose coordinates or colors changed, so
+    an unchanged poll costs a few comparisons and no Tk redraw at all.
+    """
+    MARGIN_LEFT = 34
+    MARGIN_RIGHT = 10
+    MARGIN_TOP = 8
+    MARGIN_BOTTOM = 22
+    Y_TICKS = (50, 100, 150, 200, 250, 300)
+    MIN_TICK_SPACING = 48  # pixels between x labels
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.canvas = tk.Canvas(master, highlightthickness=0, borderwidth=0, bg='#2b2b2b')
+        c = self.canvas
+        self._items = {
+            # Creation order is stacking order: band below the lines, marker on top
+            'band': c.create_polygon(0, 0, 0, 0, 0, 0, width=0),
+            'high': c.create_line(0, 0, 0, 0, dash=(4, 4)),
+            'low': c.create_line(0, 0, 0, 0, dash=(4, 4)),
+            'forecast': c.create_line(0, 0, 0, 0, width=1.5, dash=(6, 4)),
+            'series': c.create_line(0, 0, 0, 0, width=2, joinstyle=tk.ROUND, capstyle=tk.ROUND),
+            'marker': c.create_oval(0, 0, 0, 0, width=0),
+            'frame': c.create_rectangle(0, 0, 0, 0),
+        }
+        self._y_labels = [c.create_text(0, 0, anchor='e', text=str(v), font=('TkDefaultFont', 8))
+                          for v in self.Y_TICKS]
+        self._x_labels = []
+        self._span_items = []
+        self._coords = {}
+        self._config = {}
+        self._scene = None
+        self._theme = None
+        self._size = (0, 0)
+        c.bind('<Configure>', self._on_resize)
+
+    @property
+    def widget(self) -> tk.Widget:
+        return self.canvas
+
+    def render(self, scene: Optional[GraphScene], theme: GraphTheme) -> None:
+        self._scene = scene
+        self._theme = theme
+        self._draw()
+
+    def artist_count(self) -> int:
+        return len(self.canvas.find_all())
+
+    def _on_resize(self, event):
+        size = (event.width, event.height)
+        if size != self._size:
+            self._size = size
+            self._draw()
+
+    # -- item updates; each is a no-op when nothing changed --------------------
+
+    def _set_coords(self, key, item, coords):
+        if self._coords.get(key) == coords:
+            return
+        self._coords[key] = coords
+        if coords:
+            self.canvas.coords(item, *coords)
+        self._configure(key, item, state=tk.NORMAL if coords else tk.HIDDEN)
+
+    def _configure(self, key, item, **options):
+        current = self._config.setdefault(key, {})
+        changed = {k: v for k, v in options.items() if current.get(k) != v}
+        if changed:
+            current.update(changed)
+            self.canvas.itemconfigure(item, **changed)
+
+    # -- layout --------------------------------------------------------------
+
+    def _draw(self):
+        theme = self._theme
+        if theme is None:
+            return
+        c = self.canvas
+        if c.cget('bg') != theme.bg:
+            c.configure(bg=theme.bg)
+        width = self._size[0] or c.winfo_width()
+        height = self._size[1] or c.winfo_height()
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        right, bottom = width - self.MARGIN_RIGHT, height - self.MARGIN_BOTTOM
+        if right - left < 10 or bottom - top < 10:
+            return
+
+        items = self._items
+        self._configure('frame', items['frame'], outline=theme.fg)
+        self._set_coords('frame', items['frame'], [left, top, right, bottom])
+
+        def y_px(v):
+            return np.round(bottom - (np.asarray(v, dtype=np.float64) - Y_MIN) * (bottom - top) / (Y_MAX - Y_MIN), 1)
+
+        for item, value, y in zip(self._y_labels, self.Y_TICKS, y_px(self.Y_TICKS).tolist()):
+            self._configure(('ylabel', item), item, fill=theme.fg)
+            self._set_coords(('ylabel', item), item, [left - 4, y])
+
+        scene = self._scene
+        threshold = _blend(theme.threshold, theme.bg, 0.3)
+        for key, value in (('high', scene.high if scene else None), ('low', scene.low if scene else None)):
+            self._configure(key, items[key], fill=threshold)
+            coords = [] if value is None else [left, float(y_px(value)), right, float(y_px(value))]
+            self._set_coords(key, items[key], coords)
+
+        if scene is None or not len(scene.times):
+            for key in ('band', 'forecast', 'series', 'marker'):
+                self._set_coords(key, items[key], [])
+            self._layout_x_labels([], theme)
+            self._layout_spans([], theme)
+            return
+
+        times = np.asarray(scene.times, dtype=np.float64)
+        values = np.asarray(scene.values, dtype=np.float64)
+        forecast = scene.forecast
+        latest = times[-1]
+        if scene.x_range is not None:
+            # The canvas does not clip; cut the series at the window edges instead
+            t0, t1 = scene.x_range
+            times, values = self._clip(times, values, t0, t1)
+            if forecast is not None and forecast.times[0] > t1:
+                forecast = None
+        else:
+            t0 = times[0]
+            t1 = max(times[-1], forecast.times[-1] if forecast is not None else times[-1])
+        span = (t1 - t0) or 1.0
+
+        def x_px(t):
+            return np.round(left + (np.asarray(t, dtype=np.float64) - t0) * (right - left) / span, 1)
+
+        def points(xs, ys):
+            return np.column_stack((xs, ys)).ravel().tolist()
+
+        spans = [(e, max(e.start, t0), min(e.end, t1)) for e in scene.episodes]
+        self._layout_spans([(e, float(x_px(a)), float(x_px(b)), top, bottom) for e, a, b in spans if a < b], theme)
+
+        xs = x_px(times)
+        ys = y_px(np.clip(values, Y_MIN, Y_MAX))
+        self._configure('series', items['series'], fill=theme.line)
+        self._set_coords('series', items['series'], points(xs, ys) if len(xs) > 1 else [])
+
+        self._configure('marker', items['marker'], fill=theme.line)
+        if t0 <= latest <= t1:
+            mx, my = float(x_px(latest)), float(y_px(min(max(scene.last_value, Y_MIN), Y_MAX)))
+            self._set_coords('marker', items['marker'], [mx - 3, my - 3, mx + 3, my + 3])
+        else:
+            self._set_coords('marker', items['marker'], [])
+
+        if forecast is not None and len(forecast.times) > 1:
+            fx = x_px(forecast.times)
+            upper = y_px(np.clip(forecast.upper, Y_MIN, Y_MAX))
+            lower = y_px(np.clip(forecast.lower, Y_MIN, Y_MAX))
+            self._configure('band', items['band'], fill=_blend(theme.line, theme.bg, 0.15))
+            self._set_coords('band', items['band'], points(np.concatenate((fx, fx[::-1])),
+                                                           np.concatenate((upper, lower[::-1]))))
+            self._configure('forecast', items['forecast'], fill=_blend(theme.line, theme.bg, 0.8))
+            self._set_coords('forecast', items['forecast'],
+                             points(fx, y_px(np.clip(forecast.mean, Y_MIN, Y_MAX))))
+        else:
+            self._set_coords('band', items['band'], [])
+            self._set_coords('forecast', items['forecast'], [])
+
+        # Hour (or day) ticks in local time, thinned out to fit the width
+        offsets = _local_offsets([t0, t1])
+        step, fmt = _tick_step(span, right - left, self.MIN_TICK_SPACING)
+        first = np.ceil((t0 + offsets.min()) / step) * step
+        ticks = np.arange(first, t1 + offsets.max() + 1, step)
+        # Local tick times back to epoch; the second pass settles ticks next to a DST switch
+        epoch = ticks - _local_offsets(ticks - offsets[-1])
+        epoch = ticks - _local_offsets(epoch)
+        keep = (epoch >= t0) & (epoch <= t1)
+        labels = [(float(x), time.strftime(fmt, time.gmtime(t)))
+                  for x, t in zip(x_px(epoch[keep]).tolist(), ticks[keep].tolist())]
+        self._layout_x_labels(labels, theme, bottom + 4)
+
+    @staticmethod
+    def _clip(times, values, t0, t1):
+        """Readings inside [t0, t1], with interpolated end points where the series crosses an edge."""
+        inside = (times >= t0) & (times <= t1)
+        edges = [t for t in (t0, t1) if times[0] < t < times[-1]]
+        if not edges:
+            return times[inside], values[inside]
+        times_out = np.concatenate((times[inside], edges))
+        values_out = np.concatenate((values[inside], np.interp(edges, times, values)))
+        order = np.argsort(times_out, kind='stable')
+        return times_out[order], values_out[order]
+
+    def _layout_spans(self, spans, theme):
+        # Episode shading, pooled like the x labels and kept below every other item
+        c = self.canvas
+        while len(self._span_items) < len(spans):
+            item = c.create_rectangle(0, 0, 0, 0, width=0)
+            c.tag_lower(item)
+            self._span_items.append(item)
+        for i, item in enumerate(self._span_items):
+            key = ('span', item)
+            if i < len(spans):
+                episode, x0, x1, top, bottom = spans[i]
+                self._configure(key, item, fill=_blend(_span_fill(episode, theme), theme.bg, 0.15))
+                self._set_coords(key, item, [x0, top, x1, bottom])
+            else:
+                self._set_coords(key, item, [])
+
+    def _layout_x_labels(self, labels, theme, y=0):
+        # Reuse label items; create more only when the window grows
+        c = self.canvas
+        while len(self._x_labels) < len(labels):
+            self._x_labels.append(c.create_text(0, 0, anchor='n', font=('TkDefaultFont', 8)))
+        for i, item in enumerate(self._x_labels):
+            key = ('xlabel', item)
+            if i < len(labels):
+                x, text = labels[i]
+                self._configure(key, item, text=text, fill=theme.fg)
+                self._set_coords(key, item, [x, y])
+            else:
+                self._set_coords(key, item, [])
+
+
+def create_renderer(kind: str, master) -> GraphRenderer:
+    if kind == RENDERER_CANVAS:
+        return CanvasRenderer(master)
+    return MatplotlibRenderer(master)
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from glucose_data import GraphColumns, empty_columns
+
+# Where a reading came from; kept so imports and backfills can be told apart later
+SOURCE_POLL = 0
+SOURCE_IMPORT = 1
+SOURCE_BACKFILL = 2
+
+
+class HistoryStore:
+    """
+    Long-term reading history in a local SQLite database.
+
+    Readings are keyed by whole epoch seconds (an INTEGER PRIMARY KEY, so range
+    scans walk the table b-tree directly). Writes go through one shared
+    connection guarded by a lock; bulk reads open their own connection so a
+    long export never blocks the live poll (WAL mode).
+
+    The app keeps one database per account (see account_path) and switches the
+    same store between them with open() and close(), so everything holding
+    the store follows the logged-in account.
+    """
+    # Shared database from before histories were kept per account
+    DEFAULT_PATH = os.path.expanduser("~/.libreview_monitor_history.sqlite3")
+    CHUNK_SIZE = 10000
+
+    def __init__(self, path: Optional[str] = None, connect: bool = True):
+        self.path = path or self.DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if connect:
+            self.open(self.path)
+
+    @classmethod
+    def account_path(cls, account_id: str) -> str:
+        """
+        Database for the account with hash `account_id`. The shared database
+        from before per-account histories is handed to the first account asked for.
+        """
+        path = os.path.expanduser(f"~/.libreview_monitor_history-{account_id[:16]}.sqlite3")
+        if not os.path.exists(path) and os.path.exists(cls.DEFAULT_PATH):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(cls.DEFAULT_PATH + suffix):
+                    os.replace(cls.DEFAULT_PATH + suffix, path + suffix)
+        return path
+
+    def open(self, path: str) -> None:
+        """Switch to the database at `path`, closing the current one."""
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS readings ("
+                " ts INTEGER PRIMARY KEY,"
+                " value REAL NOT NULL,"
+                " flags INTEGER NOT NULL DEFAULT 0,"
+                " source INTEGER NOT NULL DEFAULT 0)"
+            )
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self.path = path
+            self._conn = conn
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Caller holds _lock; tasks still running for a logged-out account fail here
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("History store is closed")
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add_columns(self, columns: GraphColumns, source: int = SOURCE_POLL, dedupe_window: float = 0) -> int:
+        """
+        Insert readings, ignoring timestamps that are already stored; returns how many were new.
+        With `dedupe_window`, readings within that many seconds of a stored one are
+        also skipped (imports have minute resolution, polled readings have seconds).
+        """
+        if not len(columns):
+            return 0
+        times = np.frombuffer(columns.times, dtype=np.float64).astype(np.int64)
+        values = np.frombuffer(columns.values, dtype=np.float32)
+        flags = np.frombuffer(columns.flags, dtype=np.uint8)
+        with self._lock, self._db:
+            if dedupe_window > 0:
+                keep = self._not_near_existing(times, int(dedupe_window))
+                times, values, flags = times[keep], values[keep], flags[keep]
+            rows = zip(times.tolist(), values.tolist(), flags.tolist(), [source] * len(times))
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO readings (ts, value, flags, source) VALUES (?, ?, ?, ?)", rows)
+            return self._db.total_changes - before
+
+    def _not_near_existing(self, times: np.ndarray, window: int) -> np.ndarray:
+        lo, hi = int(times.min()) - window, int(times.max()) + window
+        existing = np.fromiter(
+            (r[0] for r in self._db.execute("SELECT ts FROM readings WHERE ts BETWEEN ? AND ? ORDER BY ts", (lo, hi))),
+            dtype=np.int64)
+        if not len(existing):
+            return np.ones(len(times), dtype=bool)
+        # Distance to the nearest stored timestamp on either side
+        idx = np.searchsorted(existing, times)
+        after = existing[np.minimum(idx, len(existing) - 1)]
+        before = existing[np.maximum(idx - 1, 0)]
+        nearest = np.minimum(np.abs(after - times), np.abs(times - before))
+        return nearest > window
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        lo, hi = self._bounds(start, end)
+        with self._lock:
+            row = self._db.execute("SELECT COUNT(*) FROM readings WHERE ts >= ? AND ts < ?", (lo, hi)).fetchone()
+        return row[0]
+
+    def latest_timestamp(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute("SELECT MAX(ts) FROM readings").fetchone()
+        return row[0]
+
+    def find_gaps(self, start: Optional[float] = None, end: Optional[float] = None,
+                  min_gap: float = 30 * 60) -> List[Tuple[int, int]]:
+        """
+        Return (last reading before, first reading after) for every hole longer
+        than `min_gap` seconds between consecutive stored readings in [start, end).
+        """
+        lo, hi = self._bounds(start, end)
+        with self._lock:
+            return self._db.execute(
+                "SELECT prev, ts FROM ("
+                " SELECT ts, LAG(ts) OVER (ORDER BY ts) AS prev FROM readings WHERE ts >= ? AND ts < ?)"
+                " WHERE ts - prev > ? ORDER BY ts", (lo, hi, int(min_gap))).fetchall()
+
+    def query_window(self, start: float, end: float, buckets: int = 600) -> GraphColumns:
+        """
+        Readings in [start, end) at no more than about `buckets` points. Raw
+        rows when they are already sparse enough, otherwise per-bucket means
+        computed in SQL, so a month costs the same to draw as an hour.
+        """
+        lo, hi = int(start), int(end)
+        width = max(1, (hi - lo) // max(1, buckets))
+        with self._lock:
+            if width <= 60:
+                rows = self._db.execute(
+                    "SELECT ts, value, flags FROM readings WHERE ts >= ? AND ts < ? ORDER BY ts", (lo, hi)).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT AVG(ts), AVG(value), MAX(flags) FROM readings WHERE ts >= ? AND ts < ?"
+                    " GROUP BY (ts - ?) / ? ORDER BY 1", (lo, hi, lo, width)).fetchall()
+        if not rows:
+            return empty_columns()
+        ts, values, flags = zip(*rows)
+        return GraphColumns(array('d', ts), array('f', values), array('B', flags))
+
+    def iter_chunks(self, start: Optional[float] = None, end: Optional[float] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[GraphColumns]:
+        """
+        Yield readings in [start, end) as columns of at most `chunk_size` rows.
+        Uses keyset pagination on its own connection, so memory stays constant
+        however long the range is.
+        """
+        lo, hi = self._bounds(start, end)
+        with self._lock:
+            if self._conn is None:
+                raise sqlite3.ProgrammingError("History store is closed")
+            path = self.path
+        conn = sqlite3.connect(path)
+        try:
+            last = lo - 1
+            while True:
+                rows = conn.execute(
+                    "SELECT ts, value, flags FROM readings WHERE ts > ? AND ts < ? ORDER BY ts LIMIT ?",
+                    (last, hi, chunk_size)).fetchall()
+                if not rows:
+                    return
+                ts, values, flags = zip(*rows)
+                yield GraphColumns(array('d', ts), array('f', values), array('B', flags))
+                last = ts[-1]
+        finally:
+            conn.close()
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> GraphColumns:
+        out = empty_columns()
+        for chunk in self.iter_chunks(start, end):
+            out.times.extend(chunk.times)
+            out.values.extend(chunk.values)
+            out.flags.extend(chunk.flags)
+        return out
+
+    @staticmethod
+    def default_path() -> str:
+        """For the command-line tools: the logged-in account's database, else the shared one."""
+        from config import Config
+        return Config().history_path() or HistoryStore.DEFAULT_PATH
+
+    @staticmethod
+    def _bounds(start: Optional[float], end: Optional[float]):
+        lo = int(start) if start is not None else -(1 << 62)
+        hi = int(end) if end is not None else 1 << 62
+        return lo, hi
@@ -0,0 +1,259 @@
+import argparse
+import csv
+import itertools
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional
+
+import numpy as np
+
+from glucose_data import GraphColumns, TimestampParser
+from history import SOURCE_IMPORT, HistoryStore
+
+# LibreView "Device Timestamp" formats, depending on the account's locale.
+# Tried in order; day-first variants only win when month-first cannot parse.
+CSV_TIMESTAMP_FORMATS = [
+    '%m-%d-%Y %H:%M',
+    '%d-%m-%Y %H:%M',
+    '%Y-%m-%d %H:%M',
+    '%m/%d/%Y %H:%M',
+    '%d/%m/%Y %H:%M',
+    '%d.%m.%Y %H:%M',
+] + TimestampParser().formats
+
+RECORD_HISTORIC = 0
+RECORD_SCAN = 1
+MMOL_TO_MGDL = 18.0182
+CHUNK_SIZE = 20000
+# A polled reading within this many seconds of an imported one is the same measurement
+DEDUPE_WINDOW = 60
+
+# Column positions in the English export, used when the header is localized
+_DEFAULT_COLUMNS = {"timestamp": 2, "type": 3, "historic": 4, "scan": 5}
+
+
+def _find_columns(header: List[str]):
+    cols = dict(_DEFAULT_COLUMNS)
+    mmol = False
+    for i, name in enumerate(h.strip().lower() for h in header):
+        if name == "device timestamp":
+            cols["timestamp"] = i
+        elif name == "record type":
+            cols["type"] = i
+        elif name.startswith("historic glucose"):
+            cols["historic"] = i
+            mmol = "mmol" in name
+        elif name.startswith("scan glucose"):
+            cols["scan"] = i
+    return cols, mmol
+
+
+def detect_timestamp_format(samples: List[str]) -> Optional[str]:
+    """Pick the first format that parses every sample, so DD-MM files are not read as MM-DD."""
+    samples = [s.strip() for s in samples if s.strip()]
+    for fmt in CSV_TIMESTAMP_FORMATS:
+        try:
+            for s in samples:
+                datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        return fmt
+    return None
+
+
+class _FixedWidthDecoder:
+    """
+    Vectorized decoding of zero-padded timestamps for one strptime format.
+    Field offsets are found by formatting a probe date; each chunk of strings is
+    then viewed as a (rows, width) array of code points and the digits are
+    combined arithmetically, with no per-row Python parsing.
+    """
+    _PROBE = datetime(1999, 11, 22, 13, 44, 55)
+
+    def __init__(self, fmt: str):
+        probe = self._PROBE.strftime(fmt)
+        self.width = len(probe)
+        self.fields = {}
+        for key, text in (("Y", "1999"), ("m", "11"), ("d", "22"), ("H", "13"), ("M", "44"), ("S", "55")):
+            pos = probe.find(text)
+            if pos >= 0:
+                self.fields[key] = (pos, len(text))
+        if "%p" in fmt or "%I" in fmt or not all(k in self.fields for k in "YmdHM"):
+            raise ValueError(f"format {fmt!r} is not fixed-width")
+
+    def decode(self, strings: np.ndarray) -> np.ndarray:
+        """Return naive local epoch seconds, or raise ValueError if any row is not fixed-width."""
+        if np.any(np.char.str_len(strings) != self.width):
+            raise ValueError("row width mismatch")
+        codes = np.ascontiguousarray(strings.astype(f"U{self.width}")).view(np.uint32)
+        codes = codes.reshape(len(strings), self.width).astype(np.int64) - ord("0")
+
+        def field(key):
+            if key not in self.fields:
+                return 0
+            pos, n = self.fields[key]
+            out = np.zeros(len(strings), dtype=np.int64)
+            for k in range(n):
+                out = out * 10 + codes[:, pos + k]
+            return out
+
+        years, months, days = field("Y"), field("m"), field("d")
+        if np.any((months < 1) | (months > 12) | (days < 1) | (days > 31)):
+            raise ValueError("date field out of range")
+        dates = ((years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+                 + (months - 1).astype("timedelta64[M]")).astype("datetime64[D]") + (days - 1).astype("timedelta64[D]")
+        return dates.astype("datetime64[s]").astype(np.int64) + field("H") * 3600 + field("M") * 60 + field("S")
+
+
+def local_naive_to_epoch(naive: np.ndarray) -> np.ndarray:
+    """
+    Interpret naive local seconds the way datetime.timestamp() does, DST included.
+    The UTC offset is computed once per distinct hour rather than per row.
+    """
+    hours, inverse = np.unique(naive // 3600, return_inverse=True)
+    epoch = datetime(1970, 1, 1)
+    local = np.array([(epoch + timedelta(hours=int(h))).timestamp() for h in hours])
+    return naive + (local - hours * 3600)[inverse]
+
+
+def _to_float(strings: np.ndarray) -> np.ndarray:
+    strings = np.char.replace(np.char.strip(strings), ",", ".")
+    return np.where(strings == "", "nan", strings).astype(np.float64)
+
+
+class LibreViewCsvReader:
+    """Reads a LibreView glucose export as (epoch seconds, mg/dL) array chunks of at most `chunk_size` readings."""
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            head = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(head, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.reader(f, dialect)
+
+            # Skip the report banner line(s) up to the column header
+            header = []
+            for row in reader:
+                if any(c.strip().lower() in ("device timestamp", "record type") for c in row):
+                    header = row
+                    break
+            cols, mmol = _find_columns(header)
+            width = max(cols.values()) + 1
+
+            decoder = None
+            fmt = None
+            while True:
+                chunk = list(itertools.islice(reader, self.chunk_size))
+                if not chunk:
+                    return
+                # Short rows (notes, blank lines) can fill a whole chunk mid-file
+                rows = [r for r in chunk if len(r) >= width]
+                if not rows:
+                    continue
+                rec_type = np.array([r[cols["type"]] for r in rows])
+                stamps = np.array([r[cols["timestamp"]].strip() for r in rows])
+                historic = _to_float(np.array([r[cols["historic"]] for r in rows]))
+                scan = _to_float(np.array([r[cols["scan"]] for r in rows]))
+
+                is_historic = rec_type == str(RECORD_HISTORIC)
+                values = np.where(is_historic, historic, np.where(rec_type == str(RECORD_SCAN), scan, np.nan))
+                keep = ~np.isnan(values)
+                if not keep.any():
+                    continue
+                stamps = stamps[keep]
+                values = values[keep]
+                if mmol:
+                    values = np.round(values * MMOL_TO_MGDL)
+
+                if fmt is None:
+                    # One sample per distinct date, so a DD-MM file is caught by any day > 12
+                    _, first = np.unique(np.char.partition(stamps, " ")[:, 0], return_index=True)
+                    fmt = detect_timestamp_format(list(stamps[first]))
+                    if fmt is None:
+                        raise ValueError("Unrecognized timestamp format in LibreView export")
+                    try:
+                        decoder = _FixedWidthDecoder(fmt)
+                    except ValueError:
+                        decoder = None
+
+                times = self._decode_times(stamps, fmt, decoder)
+                ok = ~np.isnan(times)
+                order = np.argsort(times[ok], kind="stable")
+                yield (times[ok][order], values[ok][order])
+
+    @staticmethod
+    def _decode_times(stamps: np.ndarray, fmt: str, decoder: Optional[_FixedWidthDecoder]) -> np.ndarray:
+        if decoder is not None:
+            try:
+                return local_naive_to_epoch(decoder.decode(stamps)).astype(np.float64)
+            except ValueError:
+                pass
+        # Irregular rows: fall back to the same parser the live graph uses
+        parser = TimestampParser([fmt] + CSV_TIMESTAMP_FORMATS)
+        return np.array([parser.parse(s) or np.nan for s in stamps], dtype=np.float64)
+
+
+class ImportResult(NamedTuple):
+    read: int
+    inserted: int
+    # [start, end) covering every chunk that added readings; None when nothing was added
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+def import_libreview_csv(store: HistoryStore, path: str, chunk_size: int = CHUNK_SIZE,
+                         progress: Optional[Callable[[int, int], None]] = None, token=None) -> ImportResult:
+    """
+    Import a LibreView CSV export into `store`, skipping readings already
+    polled within DEDUPE_WINDOW seconds. `progress(read, inserted)` is called
+    after each chunk.
+    """
+    from array import array
+
+    read = inserted = 0
+    start = end = None
+    for times, values in LibreViewCsvReader(path, chunk_size):
+        if token is not None and token.cancelled:
+            break
+        columns = GraphColumns(array('d', times.tobytes()), array('f', values.astype(np.float32).tobytes()),
+                               array('B', bytes(len(times))))
+        read += len(times)
+        added = store.add_columns(columns, source=SOURCE_IMPORT, dedupe_window=DEDUPE_WINDOW)
+        if added and len(times):
+            # Chunks are sorted, but the file as a whole need not be
+            start = min(start, times[0]) if start is not None else float(times[0])
+            end = max(end, times[-1] + 1) if end is not None else float(times[-1] + 1)
+        inserted += added
+        if progress:
+            progress(read, inserted)
+    return ImportResult(read, inserted, start, end)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import a LibreView glucose CSV export into the local history.")
+    parser.add_argument("csv_file", help="CSV exported from libreview.com")
+    parser.add_argument("--db", default=None, help="history database (default: the logged-in account's)")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db or HistoryStore.default_path())
+
+    def report(read, inserted):
+        print(f"\rRead {read} readings, {inserted} new", end="", file=sys.stderr)
+
+    try:
+        read, inserted, _, _ = import_libreview_csv(store, args.csv_file, progress=report)
+    finally:
+        store.close()
+    print(f"\nImported {inserted} of {read} readings from {args.csv_file}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
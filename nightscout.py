@@ -0,0 +1,182 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from glucose_data import GraphColumns
+
+# LibreView TrendArrow (1-5) to Nightscout direction names
+DIRECTIONS = {1: "SingleDown", 2: "FortyFiveDown", 3: "Flat", 4: "FortyFiveUp", 5: "SingleUp"}
+
+
+class NightscoutUploader:
+    """
+    Mirrors readings into a Nightscout site (POST /api/v1/entries).
+
+    New readings go into a durable SQLite outbox first. flush() uploads the
+    oldest `batch_size` entries per request over one pooled keep-alive
+    session, moving them from the outbox to the uploaded set in the same
+    transaction. Only readings not in the uploaded set are queued, so
+    overlapping poll windows and restarts do not produce duplicates, while
+    readings backfilled or imported into the past still get mirrored.
+    Failures leave the outbox untouched and back off exponentially.
+
+    Both tables belong to one site: pointing the uploader at a different URL
+    clears them, so nothing queued for the old site is sent to the new one.
+    """
+    DEFAULT_PATH = os.path.expanduser("~/.libreview_monitor_upload.sqlite3")
+    BATCH_SIZE = 288
+    TIMEOUT = (5, 30)
+    MIN_BACKOFF = 30
+    MAX_BACKOFF = 15 * 60
+    DEVICE = "LibreView Monitor"
+
+    def __init__(self, url: str, api_secret: str = "", path: Optional[str] = None, batch_size: int = BATCH_SIZE):
+        self.url = url.rstrip("/")
+        self.batch_size = batch_size
+        self.path = path or self.DEFAULT_PATH
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.headers.update({"content-type": "application/json", "accept": "application/json"})
+        if api_secret:
+            # Nightscout expects the SHA-1 of the API secret
+            self._session.headers["api-secret"] = hashlib.sha1(api_secret.encode()).hexdigest()
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " ts INTEGER PRIMARY KEY, value REAL NOT NULL, trend INTEGER)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS uploaded (ts INTEGER PRIMARY KEY)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)")
+            row = self._conn.execute("SELECT value FROM state WHERE key = 'site'").fetchone()
+            if row is not None and row[0] != self.url:
+                self._conn.execute("DELETE FROM outbox")
+                self._conn.execute("DELETE FROM uploaded")
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('site', ?)", (self.url,))
+
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.uploaded = 0
+        self.rate = 0.0  # entries per second during the last successful flush
+        self.last_error = None
+
+    def close(self, timeout: float = -1) -> bool:
+        """
+        Stop uploading and release the session and database. A running flush
+        stops after its current request; close() waits up to `timeout` seconds
+        for it (forever by default) and leaves the database open if it is
+        still running, returning False.
+        """
+        self._closed = True
+        if not self._flush_lock.acquire(timeout=timeout):
+            print("Nightscout upload still running; leaving it to finish")
+            return False
+        try:
+            self._session.close()
+            with self._lock:
+                self._conn.close()
+        finally:
+            self._flush_lock.release()
+        return True
+
+    def enqueue(self, columns: GraphColumns, trend: Optional[int] = None) -> int:
+        """Queue readings that were never uploaded; returns how many were new."""
+        if not len(columns):
+            return 0
+        rows = [(int(t), float(v), None) for t, v in zip(columns.times, columns.values)]
+        rows[-1] = rows[-1][:2] + (trend,)
+        with self._lock, self._conn:
+            if self._closed:
+                return 0
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox (ts, value, trend)"
+                " SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM uploaded WHERE ts = ?)",
+                (r + (r[0],) for r in rows))
+            inserted = self._conn.total_changes - before
+            if trend is not None:
+                # The newest reading may already be queued without its trend
+                self._conn.execute("UPDATE outbox SET trend = ? WHERE ts = ?", (trend, rows[-1][0]))
+            return inserted
+
+    def queued(self) -> int:
+        with self._lock:
+            if self._closed:
+                return 0
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def flush(self, token=None) -> int:
+        """Upload queued entries in batches until the outbox is empty or a request fails."""
+        if time.monotonic() < self._retry_at:
+            return 0
+        if not self._flush_lock.acquire(blocking=False):
+            return 0  # another flush is already draining the outbox
+        try:
+            sent = 0
+            started = time.monotonic()
+            while not self._closed and (token is None or not token.cancelled):
+                with self._lock:
+                    batch = self._conn.execute(
+                        "SELECT ts, value, trend FROM outbox ORDER BY ts LIMIT ?", (self.batch_size,)).fetchall()
+                if not batch:
+                    break
+                try:
+                    response = self._session.post(f"{self.url}/api/v1/entries",
+                                                  json=[self._entry(*row) for row in batch], timeout=self.TIMEOUT)
+                    response.raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    self._failed(e)
+                    break
+                with self._lock, self._conn:
+                    self._conn.executemany("DELETE FROM outbox WHERE ts = ?", ((row[0],) for row in batch))
+                    self._conn.executemany("INSERT OR IGNORE INTO uploaded (ts) VALUES (?)",
+                                           ((row[0],) for row in batch))
+                sent += len(batch)
+                self._backoff = 0.0
+                self.last_error = None
+            if sent:
+                self.uploaded += sent
+                self.rate = sent / max(time.monotonic() - started, 1e-3)
+            return sent
+        finally:
+            self._flush_lock.release()
+
+    def describe(self) -> str:
+        """One-line status for the status bar."""
+        queued = self.queued()
+        text = f"Nightscout: {self.uploaded} uploaded, {queued} queued"
+        if self.rate:
+            text += f", {self.rate:.0f} entries/s"
+        if self.last_error:
+            text += f" (retry in {max(0, int(self._retry_at - time.monotonic()))}s)"
+        return text
+
+    def _failed(self, error) -> None:
+        self.last_error = str(error)
+        self._backoff = min(max(self._backoff * 2, self.MIN_BACKOFF), self.MAX_BACKOFF)
+        self._retry_at = time.monotonic() + self._backoff
+        print(f"Nightscout upload failed: {error}")
+
+    def _entry(self, ts: int, value: float, trend: Optional[int]) -> dict:
+        entry = {
+            "type": "sgv",
+            "sgv": int(round(value)),
+            "date": ts * 1000,
+            "dateString": datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "device": self.DEVICE,
+        }
+        if trend in DIRECTIONS:
+            entry["direction"] = DIRECTIONS[trend]
+        return entry
@@ -0,0 +1,379 @@
+import argparse
+import collections
+import hmac
+import json
+import os
+import secrets
+import selectors
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from glucose_data import FLAG_COLOR_MASK, FLAG_HIGH, FLAG_LOW, GraphColumns
+
+# Windows (and Pythons without AF_UNIX) fall back to TCP on the loopback interface
+USE_TCP = sys.platform == "win32" or not hasattr(socket, "AF_UNIX")
+DEFAULT_SOCKET = os.path.expanduser("~/.libreview_monitor.sock")
+DEFAULT_PORT = 47862
+# Shared secret TCP subscribers must present; a Unix socket is protected by its file mode instead
+TOKEN_FILE = os.path.expanduser("~/.libreview_monitor_pubsub.token")
+
+
+def default_address():
+    return ("127.0.0.1", DEFAULT_PORT) if USE_TCP else DEFAULT_SOCKET
+
+
+def load_token(path: str = TOKEN_FILE, create: bool = False) -> Optional[str]:
+    """Read the subscriber token, creating a random one readable only by this user if asked to."""
+    try:
+        with open(path, "r") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    if not create:
+        return None
+    token = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token + "\n")
+    return token
+
+
+def reading_dicts(columns: GraphColumns, trend: Optional[int] = None) -> List[dict]:
+    """Wire format of a reading; `trend` is only known for the newest one."""
+    out = [
+        {"ts": int(t), "time": datetime.fromtimestamp(t).isoformat(), "value": round(v, 1),
+         "color": f & FLAG_COLOR_MASK, "high": bool(f & FLAG_HIGH), "low": bool(f & FLAG_LOW), "trend": None}
+        for t, v, f in zip(columns.times, columns.values, columns.flags)
+    ]
+    if out:
+        out[-1]["trend"] = trend
+    return out
+
+
+def _encode(readings: List[dict], replay: bool = False) -> bytes:
+    return (json.dumps({"replay": replay, "readings": readings}, separators=(",", ":")) + "\n").encode()
+
+
+class _Client:
+    __slots__ = ("sock", "pending", "sent", "dropped", "stalled_since", "authenticated", "received")
+
+    def __init__(self, sock: socket.socket, max_batches: int, authenticated: bool = True):
+        self.sock = sock
+        self.authenticated = authenticated
+        self.received = b""  # token bytes read so far, until authenticated
+        # Encoded batches waiting to be written; the oldest is dropped when full
+        self.pending: Deque[bytes] = collections.deque(maxlen=max_batches)
+        self.sent = 0  # bytes of pending[0] already written
+        self.dropped = 0
+        self.stalled_since = None
+
+
+class ReadingPublisher:
+    """
+    Fans new readings out to local subscribers, so one upstream poll serves
+    any number of consumers (home automation, bedside displays, ...).
+
+    Subscribers connect to a Unix socket (TCP on localhost on Windows) and
+    receive JSON lines, one per batch: {"replay": bool, "readings": [...]}.
+    On connect they first get the last `replay` readings in one batch. Over
+    TCP, where any local user could connect, a subscriber must first send the
+    token from TOKEN_FILE and a newline; until then it receives nothing.
+
+    A single selector thread does all socket I/O. Each batch is encoded once
+    and shared by every client. A slow client's queue holds at most
+    `max_batches`; beyond that its oldest batches are dropped. A client that
+    makes no progress for STALL_TIMEOUT seconds is disconnected.
+    """
+    STALL_TIMEOUT = 60
+
+    AUTH_TIMEOUT = 5
+    MAX_TOKEN_BYTES = 256
+
+    def __init__(self, address=None, replay: int = 288, max_batches: int = 64, token_file: str = TOKEN_FILE):
+        self.address = address or default_address()
+        self.token_file = token_file
+        self._token: Optional[bytes] = None
+        self.max_batches = max(2, max_batches)
+        self._recent: Deque[dict] = collections.deque(maxlen=replay)
+        self._inbox: List[List[dict]] = []
+        self._inbox_lock = threading.Lock()
+        # Timestamps already published, oldest evicted first; bounded like the replay buffer
+        self._published = set()
+        self._published_order: Deque[int] = collections.deque()
+        self._published_limit = max(replay, 288) * 4
+        self._clients: Dict[int, _Client] = {}
+        self._selector = None
+        self._server = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_w.setblocking(False)
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self) -> bool:
+        """Bind and start serving; returns False (and stays inert) if the address is taken."""
+        try:
+            if USE_TCP:
+                self._token = load_token(self.token_file, create=True).encode()
+            self._server = self._bind()
+        except OSError as e:
+            print(f"Reading publisher disabled: {e}")
+            return False
+        self._server.setblocking(False)
+        self._wake_r.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self._thread = threading.Thread(target=self._loop, name="reading-publisher", daemon=True)
+        self._thread.start()
+        return True
+
+    def _bind(self) -> socket.socket:
+        if USE_TCP:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(self.address)
+        else:
+            if os.path.exists(self.address):
+                # A leftover socket file from a crash is removed; a live one means another instance
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.address)
+                    raise OSError(f"{self.address} is already served by another instance")
+                except ConnectionRefusedError:
+                    os.unlink(self.address)
+                finally:
+                    probe.close()
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            old_umask = os.umask(0o177)
+            try:
+                server.bind(self.address)
+            finally:
+                os.umask(old_umask)
+        server.listen(16)
+        return server
+
+    def publish(self, columns: GraphColumns, trend: Optional[int] = None) -> None:
+        """Queue new readings for every subscriber; safe to call from any thread."""
+        if not len(columns) or self._thread is None:
+            return
+        readings = reading_dicts(columns, trend)
+        with self._inbox_lock:
+            # Callers may pass overlapping windows and late readings; each timestamp goes out once
+            readings = [r for r in readings if r["ts"] not in self._published]
+            if not readings:
+                return
+            for r in readings:
+                self._remember(r["ts"])
+            self._inbox.append(readings)
+        self._wake()
+
+    def _remember(self, ts: int) -> None:
+        # Caller holds _inbox_lock
+        self._published.add(ts)
+        self._published_order.append(ts)
+        if len(self._published_order) > self._published_limit:
+            self._published.discard(self._published_order.popleft())
+
+    def subscriber_count(self) -> int:
+        return len(self._clients)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        if self._thread is None:
+            self._wake_r.close()
+            self._wake_w.close()
+            return
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake()
+        self._thread.join(timeout)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass  # buffer full: a wakeup is already pending
+
+    def _loop(self) -> None:
+        try:
+            while not self._closed.is_set():
+                for key, events in self._selector.select(timeout=min(self.AUTH_TIMEOUT, self.STALL_TIMEOUT / 4)):
+                    if key.data == "accept":
+                        self._accept()
+                    elif key.data == "wake":
+                        self._drain_wakeups()
+                    else:
+                        client = key.data
+                        if events & selectors.EVENT_READ and not self._read(client):
+                            continue
+                        if events & selectors.EVENT_WRITE:
+                            self._flush(client)
+                self._flush_inbox()
+                self._drop_stalled()
+        finally:
+            for client in list(self._clients.values()):
+                self._disconnect(client)
+            self._selector.close()
+            self._server.close()
+            self._wake_r.close()
+            self._wake_w.close()
+            if not USE_TCP:
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+
+    def _accept(self) -> None:
+        try:
+            sock, _ = self._server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        client = _Client(sock, self.max_batches, authenticated=self._token is None)
+        self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+        if client.authenticated:
+            self._send_replay(client)
+        else:
+            client.stalled_since = time.monotonic()
+
+    def _send_replay(self, client: _Client) -> None:
+        if self._recent:
+            self._enqueue(client, _encode(list(self._recent), replay=True))
+
+    def _authenticate(self, client: _Client, data: bytes) -> bool:
+        client.received += data
+        if b"\n" not in client.received:
+            if len(client.received) <= self.MAX_TOKEN_BYTES:
+                return True
+        elif hmac.compare_digest(client.received.split(b"\n", 1)[0].strip(), self._token):
+            client.authenticated = True
+            client.received = b""
+            client.stalled_since = None
+            self._send_replay(client)
+            return True
+        self._disconnect(client)
+        return False
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _flush_inbox(self) -> None:
+        with self._inbox_lock:
+            batches, self._inbox = self._inbox, []
+        if not batches:
+            return
+        # Everything published since the last pass goes out as one batch
+        readings = [r for batch in batches for r in batch]
+        self._recent.extend(readings)
+        data = _encode(readings)
+        for client in list(self._clients.values()):
+            if client.authenticated:
+                self._enqueue(client, data)
+
+    def _enqueue(self, client: _Client, data: bytes) -> None:
+        if len(client.pending) == client.pending.maxlen:
+            if client.sent:
+                # Never cut a partially written line; drop the next one instead
+                head = client.pending.popleft()
+                client.pending.popleft()
+                client.pending.appendleft(head)
+            client.dropped += 1
+        was_idle = not client.pending
+        client.pending.append(data)
+        if was_idle:
+            client.stalled_since = time.monotonic()
+            self._selector.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+            self._flush(client)
+
+    def _flush(self, client: _Client) -> None:
+        while client.pending:
+            head = client.pending[0]
+            try:
+                n = client.sock.send(head[client.sent:])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self._disconnect(client)
+                return
+            client.stalled_since = time.monotonic()
+            client.sent += n
+            if client.sent < len(head):
+                return
+            client.pending.popleft()
+            client.sent = 0
+        client.stalled_since = None
+        if client.sock.fileno() in self._clients:
+            self._selector.modify(client.sock, selectors.EVENT_READ, client)
+
+    def _read(self, client: _Client) -> bool:
+        # Apart from the TCP token, subscribers have nothing to say; reading only detects hang-ups
+        try:
+            data = client.sock.recv(4096)
+            if data:
+                return client.authenticated or self._authenticate(client, data)
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            pass
+        self._disconnect(client)
+        return False
+
+    def _drop_stalled(self) -> None:
+        now = time.monotonic()
+        for client in list(self._clients.values()):
+            limit = self.STALL_TIMEOUT if client.authenticated else self.AUTH_TIMEOUT
+            if client.stalled_since is not None and now - client.stalled_since > limit:
+                self._disconnect(client)
+
+    def _disconnect(self, client: _Client) -> None:
+        fd = client.sock.fileno()
+        if self._clients.pop(fd, None) is None:
+            return
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Print readings published by a running LibreView Monitor.")
+    parser.add_argument("--socket", default=None,
+                        help=f"Unix socket path, or host:port for TCP (default: {default_address()})")
+    parser.add_argument("--token-file", default=TOKEN_FILE, help="shared secret for TCP (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    address = args.socket or default_address()
+    if isinstance(address, str) and (USE_TCP or ":" in address):
+        host, _, port = address.rpartition(":")
+        address = (host or "127.0.0.1", int(port))
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    token = None
+    if family == socket.AF_INET:
+        token = load_token(args.token_file)
+        if token is None:
+            print(f"No token in {args.token_file}; start LibreView Monitor first", file=sys.stderr)
+            return 1
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        if token is not None:
+            sock.sendall((token + "\n").encode())
+        for line in sock.makefile("r", encoding="utf-8"):
+            batch = json.loads(line)
+            for r in batch["readings"]:
+                print(f"{r['time']}  {r['value']:6.1f} mg/dL{'  (replay)' if batch['replay'] else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Lower value runs first
+PRIORITY_USER = 0          # user-initiated: login, manual refresh, tray commands
+PRIORITY_POLL = 10         # scheduled API polling
+PRIORITY_BACKGROUND = 20   # persistence, analytics, imports/exports
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to `timeout` seconds; returns True as soon as the token is cancelled."""
+        return self._event.wait(timeout)
+
+
+class TaskHandle:
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, priority: int, name: str,
+                 token: Optional[CancellationToken] = None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.name = name
+        self.token = token or CancellationToken()
+        self.submitted_at = 0.0
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+
+class TaskScheduler:
+    """
+    Owns every background thread of the app: a bounded worker pool fed from a
+    priority queue, plus one timer thread for delayed and periodic tasks.
+
+    Tasks are plain callables. Long-running ones should take the handle's
+    CancellationToken (pass it in via args) and check it between steps.
+
+    Running tasks are never preempted, so background work may occupy at most
+    `workers - reserved` workers at once. The reserved workers only ever take
+    user and poll tasks, which therefore start promptly however much bulk
+    work (imports, exports, backfills) is queued or running.
+    """
+
+    def __init__(self, workers: int = 3, name: str = "scheduler", reserved: int = 1):
+        self.name = name
+        # Heap of (priority, seq, handle); guarded by _cond
+        self._heap = []
+        self._cond = threading.Condition()
+        reserved = min(reserved, workers - 1)
+        self._max_background = workers - reserved
+        self._background_running = 0
+        self._stopping = False
+        self._seq = itertools.count()
+        self._timers = []
+        self._timer_cond = threading.Condition()
+        self._closed = False
+        self._active = set()
+
+        self._stats_lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._runtime_total = 0.0
+
+        self._workers = [
+            threading.Thread(target=self._worker, args=(i >= workers - reserved,),
+                             name=f"{name}-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._workers:
+            t.start()
+        self._timer_thread = threading.Thread(target=self._timer_loop, name=f"{name}-timer", daemon=True)
+        self._timer_thread.start()
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND, name: Optional[str] = None,
+               token: Optional[CancellationToken] = None, **kwargs) -> TaskHandle:
+        handle = TaskHandle(fn, args, kwargs, priority, name or getattr(fn, "__name__", "task"), token)
+        self._enqueue(handle)
+        return handle
+
+    def call_later(self, delay: float, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND,
+                   name: Optional[str] = None, token: Optional[CancellationToken] = None, **kwargs) -> TaskHandle:
+        handle = TaskHandle(fn, args, kwargs, priority, name or getattr(fn, "__name__", "task"), token)
+        self._add_timer(time.monotonic() + delay, handle)
+        return handle
+
+    def call_every(self, interval: float, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND,
+                   name: Optional[str] = None, initial_delay: float = 0.0, **kwargs) -> TaskHandle:
+        """
+        Run `fn` every `interval` seconds until the returned handle is cancelled.
+        The next run is scheduled only after the previous one finished, so a slow
+        run never overlaps the next.
+        """
+        periodic = TaskHandle(fn, args, kwargs, priority, name or getattr(fn, "__name__", "task"))
+
+        def run_once():
+            try:
+                fn(*args, **kwargs)
+            finally:
+                if not periodic.cancelled and not self._closed:
+                    self._add_timer(time.monotonic() + interval, run)
+
+        run = TaskHandle(run_once, (), {}, priority, periodic.name, periodic.token)
+        self._add_timer(time.monotonic() + initial_delay, run)
+        return periodic
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            finished = self._completed + self._failed
+            return {
+                "queue_depth": len(self._heap),
+                "timers": len(self._timers),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_latency": self._latency_total / finished if finished else 0.0,
+                "max_latency": self._latency_max,
+                "avg_runtime": self._runtime_total / finished if finished else 0.0,
+            }
+
+    def shutdown(self, timeout: float = 5.0) -> List[str]:
+        """
+        Stop accepting work, signal running tasks through their tokens and
+        wait up to `timeout` for them to finish.
+
+        Timers and queued tasks of every priority are dropped without running:
+        their handles are cancelled and marked done, so `wait()` on them
+        returns. Anything that must happen before exit (saving state, a final
+        upload) has to run, or be waited for, before calling this. Returns the
+        names of the dropped queued tasks.
+        """
+        with self._timer_cond:
+            if self._closed:
+                return []
+            self._closed = True
+            for _, _, handle in self._timers:
+                handle.cancel()
+            self._timers.clear()
+            self._timer_cond.notify_all()
+
+        with self._cond:
+            dropped = [handle for _, _, handle in self._heap]
+            self._heap.clear()
+            self._stopping = True
+            self._cond.notify_all()
+        for handle in dropped:
+            handle.cancel()
+            handle._done.set()
+        with self._stats_lock:
+            for handle in self._active:
+                handle.cancel()
+
+        deadline = time.monotonic() + timeout
+        for t in self._workers + [self._timer_thread]:
+            t.join(max(0.0, deadline - time.monotonic()))
+        return [handle.name for handle in dropped]
+
+    def _enqueue(self, handle: TaskHandle) -> None:
+        if self._closed:
+            handle.cancel()
+            handle._done.set()
+            return
+        handle.submitted_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._heap, (handle.priority, next(self._seq), handle))
+            # Wake everyone: a reserved worker cannot take background work
+            self._cond.notify_all()
+
+    def _add_timer(self, due: float, handle: TaskHandle) -> None:
+        with self._timer_cond:
+            if self._closed:
+                handle.cancel()
+                return
+            heapq.heappush(self._timers, (due, next(self._seq), handle))
+            self._timer_cond.notify()
+
+    def _timer_loop(self) -> None:
+        while True:
+            with self._timer_cond:
+                while not self._closed and (not self._timers or self._timers[0][0] > time.monotonic()):
+                    wait = self._timers[0][0] - time.monotonic() if self._timers else None
+                    self._timer_cond.wait(wait)
+                if self._closed:
+                    return
+                _, _, handle = heapq.heappop(self._timers)
+            if not handle.cancelled:
+                self._enqueue(handle)
+
+    def _take(self, reserved: bool) -> Optional[TaskHandle]:
+        # Caller holds _cond. Background tasks wait while their share of workers is busy.
+        if not self._heap:
+            return None
+        priority = self._heap[0][0]
+        if priority > PRIORITY_POLL:
+            if reserved or self._background_running >= self._max_background:
+                return None
+            self._background_running += 1
+        return heapq.heappop(self._heap)[2]
+
+    def _worker(self, reserved: bool = False) -> None:
+        while True:
+            with self._cond:
+                handle = self._take(reserved)
+                while handle is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    handle = self._take(reserved)
+            try:
+                self._run(handle)
+            finally:
+                if handle.priority > PRIORITY_POLL:
+                    with self._cond:
+                        self._background_running -= 1
+                        # A queued background task may now have a free worker
+                        self._cond.notify_all()
+
+    def _run(self, handle: TaskHandle) -> None:
+        if handle.cancelled:
+            handle._done.set()
+            return
+        started = time.monotonic()
+        latency = started - handle.submitted_at
+        with self._stats_lock:
+            self._running += 1
+            self._active.add(handle)
+        failed = False
+        try:
+            handle.result = handle.fn(*handle.args, **handle.kwargs)
+        except Exception as e:
+            failed = True
+            handle.error = e
+            print(f"Task {handle.name} failed: {e}")
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+                self._active.discard(handle)
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+                self._runtime_total += time.monotonic() - started
+            handle._done.set()
@@ -0,0 +1,151 @@
+import math
+from array import array
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from glucose_data import GlucoseSeries
+
+# Readings further apart than this restart the filter instead of smoothing across the gap
+MAX_GAP_SECONDS = 30 * 60
+# Sample spacings within this fraction of their mean count as uniform
+UNIFORM_TOLERANCE = 0.1
+
+
+class EMASmoother:
+    """Causal exponential moving average with a time constant, so uneven sampling is weighted correctly."""
+
+    def __init__(self, tau_minutes: float = 5.0):
+        self.tau = tau_minutes * 60
+        self.reset()
+
+    def reset(self) -> None:
+        self._value = None
+        self._time = None
+
+    def step(self, timestamp: float, value: float) -> float:
+        if self._value is None or timestamp - self._time > MAX_GAP_SECONDS:
+            self._value = value
+        else:
+            alpha = 1.0 - math.exp(-max(timestamp - self._time, 0.0) / self.tau)
+            self._value += alpha * (value - self._value)
+        self._time = timestamp
+        return self._value
+
+
+class SavitzkyGolaySmoother:
+    """
+    Causal Savitzky-Golay filter: fits a polynomial to the trailing window and
+    evaluates it at the newest sample. The endpoint weights are precomputed for
+    every window length up to `window`, so each step is a fixed-size dot product.
+
+    The precomputed weights assume evenly spaced samples. LibreView mixes
+    15-minute graph points with 1-minute current readings, so a window whose
+    spacing is not uniform is fitted against its actual timestamps instead.
+    """
+
+    def __init__(self, window: int = 9, order: int = 2):
+        self.window = window
+        self.order = order
+        self._weights = {}
+        for n in range(order + 2, window + 1):
+            x = np.arange(-(n - 1), 1, dtype=float)
+            A = np.vander(x, order + 1, increasing=True)
+            # Row 0 of the pseudo-inverse gives the fitted constant term, i.e. the value at x = 0
+            self._weights[n] = np.linalg.pinv(A)[0]
+        self.reset()
+
+    def reset(self) -> None:
+        self._buf = deque(maxlen=self.window)
+        self._times = deque(maxlen=self.window)
+
+    def step(self, timestamp: float, value: float) -> float:
+        if self._times and timestamp - self._times[-1] > MAX_GAP_SECONDS:
+            self._buf.clear()
+            self._times.clear()
+        self._times.append(timestamp)
+        self._buf.append(value)
+        weights = self._weights.get(len(self._buf))
+        if weights is None:
+            return value
+        spacing = np.diff(self._times)
+        mean = spacing.mean()
+        if spacing.max() - spacing.min() > UNIFORM_TOLERANCE * mean:
+            x = (np.array(self._times) - timestamp) / mean
+            weights = np.linalg.pinv(np.vander(x, self.order + 1, increasing=True))[0]
+        return float(np.dot(weights, self._buf))
+
+
+def make_smoother(kind: Optional[str]):
+    kind = (kind or "").lower()
+    if kind == "ema":
+        return EMASmoother()
+    if kind in ("savgol", "savitzky-golay"):
+        return SavitzkyGolaySmoother()
+    return None
+
+
+class SmoothedSeries:
+    """
+    Smoothed values cached alongside a GlucoseSeries, in a ring of the same
+    capacity so the two stay index-aligned. Only readings appended since the
+    last sync are filtered, making each update O(1) per new reading.
+    """
+
+    def __init__(self, kind: Optional[str] = "savgol"):
+        self.kind = kind
+        self._smoother = make_smoother(kind)
+        self._values = None
+        self._capacity = 0
+        self._start = 0
+        self._size = 0
+        self._seen = 0
+
+    def reset(self) -> None:
+        if self._smoother is not None:
+            self._smoother.reset()
+        self._start = 0
+        self._size = 0
+        self._seen = 0
+
+    def _append(self, value: float) -> None:
+        if self._size < self._capacity:
+            self._values[(self._start + self._size) % self._capacity] = value
+            self._size += 1
+        else:
+            self._values[self._start] = value
+            self._start = (self._start + 1) % self._capacity
+
+    def sync(self, series: GlucoseSeries) -> int:
+        if self._values is None or self._capacity != series.capacity:
+            self._capacity = series.capacity
+            self._values = array('f', [0.0]) * self._capacity
+            self.reset()
+
+        new = series.total - self._seen
+        if new == 0:
+            return 0
+        if new < 0 or new > len(series):
+            self.reset()
+            new = len(series)
+        for index in range(len(series) - new, len(series)):
+            reading = series[index]
+            if self._smoother is None:
+                self._append(reading.value)
+            else:
+                self._append(self._smoother.step(reading.timestamp, reading.value))
+        self._seen = series.total
+        return new
+
+    def values(self, series: GlucoseSeries) -> array:
+        """Smoothed values in timestamp order, with the newest point pinned to the actual measurement."""
+        out = array('f')
+        if self._values is None:
+            return out
+        end = self._start + self._size
+        out.extend(self._values[self._start:min(end, self._capacity)])
+        out.extend(self._values[0:max(0, end - self._capacity)])
+        if out and series.latest is not None:
+            out[-1] = series.latest.value
+        return out
@@ -0,0 +1,66 @@
+"""
+Measure what the tray child process costs to start.
+
+With the `spawn` start method (macOS, frozen builds) the child re-imports the
+parent's main module before running its target, so the cost is: interpreter
+start + importing `main` + importing the tray module. This script spawns a
+child that does exactly that and reports its wall time and peak RSS.
+
+    python tools/measure_tray.py [runs]
+
+On a headless Linux box set PYSTRAY_BACKEND=dummy so pystray can import.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(result_queue, started):
+    sys.path.insert(0, ROOT)
+    # What spawn does before calling the target: import the parent's main module
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("__mp_main__", os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    try:
+        import tray_process  # noqa: F401
+        import PIL.Image  # noqa: F401
+        import pystray  # noqa: F401
+    except ImportError:
+        pass
+    heavy = sorted(m for m in ("customtkinter", "matplotlib", "numpy", "requests") if m in sys.modules)
+    result_queue.put((time.time() - started, _peak_rss_mb(), heavy))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    ctx = multiprocessing.get_context("spawn")
+    times, rss = [], []
+    heavy = []
+    for _ in range(runs):
+        q = ctx.Queue()
+        p = ctx.Process(target=_child, args=(q, time.time()))
+        p.start()
+        elapsed, peak, heavy = q.get()
+        p.join()
+        times.append(elapsed)
+        rss.append(peak)
+    times.sort()
+    rss.sort()
+    print(f"runs={runs} spawn-to-ready median={times[len(times) // 2] * 1000:.0f} ms "
+          f"peak RSS median={rss[len(rss) // 2]:.1f} MB")
+    print(f"heavy modules loaded in child: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
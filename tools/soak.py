@@ -0,0 +1,194 @@
+"""
+Accelerated soak test for the dashboard.
+
+Drives a real DashboardView through weeks of simulated 5-minute polls as fast
+as Tk allows, switching theme every few hours and logging out/in once a day.
+It samples process RSS, the Tk `after` queue length and the graph's artist
+count, and fails if any of them keeps growing after the warm-up.
+
+    python tools/soak.py [--days 14] [--renderer matplotlib|canvas]
+
+Needs a display; on a headless box run it under xvfb-run.
+"""
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+import tkinter as tk
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+import customtkinter as ctk  # noqa: E402
+
+from dashboard_view import DashboardView  # noqa: E402
+from forecast import GlucoseForecaster  # noqa: E402
+from glucose_data import GlucoseSeries  # noqa: E402
+
+POLL_SECONDS = 300
+READINGS_PER_POLL = 5
+
+
+class SoakConfig:
+    """The settings DashboardView reads, without touching the user's config file."""
+
+    def __init__(self, renderer):
+        self.appearance_mode = "dark"
+        self.smoothing = "savgol"
+        self.graph_renderer = renderer
+        self.low_threshold = 70
+        self.high_threshold = 180
+
+    def save(self):
+        pass
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        pass
+    if resource is not None:
+        # No procfs (macOS): peak RSS is the best available, and still only grows on a leak
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return _windows_working_set() / (1024 * 1024)
+
+
+def _windows_working_set() -> int:
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return 0
+    return counters.WorkingSetSize
+
+
+def after_queue_length(root) -> int:
+    return len(root.tk.splitlist(root.tk.call("after", "info")))
+
+
+def synthetic_value(t: float) -> float:
+    # A daily swing plus a faster wobble, crossing both thresholds
+    day = 2 * math.pi * t / 86400
+    return 125 + 70 * math.sin(day) + 20 * math.sin(day * 9)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Soak the dashboard with weeks of simulated polling.")
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--renderer", choices=("matplotlib", "canvas"), default="matplotlib")
+    parser.add_argument("--theme-every", type=int, default=24, help="polls between theme switches")
+    parser.add_argument("--login-every", type=int, default=288, help="polls between logout/login cycles")
+    parser.add_argument("--rss-tolerance", type=float, default=25.0, help="allowed RSS growth in MB")
+    args = parser.parse_args(argv)
+
+    try:
+        root = ctk.CTk()
+    except tk.TclError as e:
+        print(f"Cannot open a display ({e}); run under xvfb-run", file=sys.stderr)
+        return 2
+    root.geometry("600x700")
+    config = SoakConfig(args.renderer)
+
+    def new_view():
+        view = DashboardView(root, on_refresh=lambda: None, on_logout=lambda: None, config=config)
+        view.pack(fill="both", expand=True)
+        return view
+
+    def pump():
+        root.update_idletasks()
+        root.update()
+
+    view = new_view()
+    series = GlucoseSeries()
+    forecaster = GlucoseForecaster()
+    polls = int(args.days * 86400 / POLL_SECONDS)
+    warmup = max(1, polls // 10)
+    sample_every = max(1, polls // 50)
+    t = time.time() - args.days * 86400
+    modes = ("Light", "Dark")
+    samples = []
+    started = time.monotonic()
+
+    for poll in range(polls):
+        for _ in range(READINGS_PER_POLL):
+            t += POLL_SECONDS / READINGS_PER_POLL
+            series.append(t, synthetic_value(t), flags=1, trend=3)
+        forecaster.sync(series)
+        view.update_data(series, forecaster.forecast())
+        pump()
+
+        if poll and poll % args.theme_every == 0:
+            view.appearance_segment.set(modes[(poll // args.theme_every) % 2])
+            view._apply_appearance()
+            pump()
+        if poll and poll % args.login_every == 0:
+            # What logout/login does in the app: destroy the view and build a new one
+            view.destroy()
+            series = GlucoseSeries()
+            forecaster.reset()
+            view = new_view()
+            pump()
+
+        if poll % sample_every == 0 or poll == polls - 1:
+            gc.collect()
+            samples.append((poll, rss_mb(), after_queue_length(root), view.renderer.artist_count()))
+
+    # Let the last fade-in finish, then everything it scheduled must be gone
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        pump()
+        time.sleep(0.02)
+    gc.collect()
+    final = (polls, rss_mb(), after_queue_length(root), view.renderer.artist_count())
+    elapsed = time.monotonic() - started
+    view.destroy()
+    root.destroy()
+
+    print(f"{polls} polls ({args.days:g} simulated days, renderer={args.renderer}) in {elapsed:.1f} s")
+    print(f"{'poll':>8} {'RSS MB':>8} {'after':>6} {'artists':>8}")
+    for poll, rss, after, artists in samples + [final]:
+        print(f"{poll:>8} {rss:>8.1f} {after:>6} {artists:>8}")
+
+    base = next(s for s in samples if s[0] >= warmup)
+    steady = [s for s in samples if s[0] >= warmup] + [final]
+    failures = []
+    if max(s[1] for s in steady) - base[1] > args.rss_tolerance:
+        failures.append(f"RSS grew from {base[1]:.1f} MB to {max(s[1] for s in steady):.1f} MB")
+    if final[2] > base[2]:
+        failures.append(f"after queue grew from {base[2]} to {final[2]}")
+    # Pooled canvas items only grow until the busiest frame has been drawn, so
+    # compare the second half of the steady state with the first
+    half = len(steady) // 2
+    early, late = max(s[3] for s in steady[:half] or steady), max(s[3] for s in steady[half:])
+    if late > early:
+        failures.append(f"artist count grew from {early} to {late} after warm-up")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print("OK: RSS, after queue and artist count stayed flat")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Local stand-in for the LibreLinkUp API, for exercising the client offline.
+
+Serves the global endpoint at / and every region under /<region>/, with the
+same login behaviour as the real service: a 403 carrying minimumVersion for
+outdated clients, and a region redirect from any endpoint that does not own
+the account. Connections, /graph and /logbook return synthetic readings.
+
+    python tools/stub_server.py --region eu --latency 0.2
+    LIBREVIEW_API_URL=http://127.0.0.1:8080 python main.py
+
+GET /_stats returns per-endpoint request counts, so round-trips can be checked.
+
+It also stands in for a Nightscout site: POST /api/v1/entries stores entries
+keyed by date (repeats are counted as duplicates), and POST /_outage with
+{"nightscout": true} makes uploads fail with 503 until it is cleared.
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = "stub-token"
+PATIENT_ID = "stub-patient"
+
+
+def _version(text):
+    try:
+        return tuple(int(p) for p in text.split("."))
+    except (AttributeError, ValueError):
+        return ()
+
+
+def _stamp(t: float) -> str:
+    # LibreLinkUp's US-style timestamp, e.g. 1/27/2026 11:48:33 PM
+    d = datetime.fromtimestamp(t)
+    return f"{d.month}/{d.day}/{d.year} {d.strftime('%I:%M:%S %p').lstrip('0')}"
+
+
+def _value(t: float) -> float:
+    day = 2 * math.pi * t / 86400
+    return round(125 + 70 * math.sin(day) + 20 * math.sin(day * 9))
+
+
+def _point(t: float) -> dict:
+    v = _value(t)
+    return {"Timestamp": _stamp(t), "ValueInMgPerDl": v, "MeasurementColor": 1 if 70 <= v <= 180 else 2,
+            "isHigh": v > 180, "isLow": v < 70, "TrendArrow": 3}
+
+
+class StubState:
+    def __init__(self, args):
+        self.region = args.region
+        self.min_version = args.min_version
+        self.email = args.email
+        self.password = args.password
+        self.latency = args.latency
+        self.ns_secret = hashlib.sha1(args.ns_secret.encode()).hexdigest() if args.ns_secret else None
+        self.ns_down = False
+        self.entries = {}
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients' connection pooling is exercised
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def _split(self):
+        # "/eu/llu/auth/login" -> ("eu", "/llu/auth/login"); the global endpoint has no prefix
+        path = self.path.split("?", 1)[0]
+        head, _, rest = path.lstrip("/").partition("/")
+        if head and head not in ("llu", "api", "_stats", "_outage"):
+            return head, "/" + rest
+        return "", path
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self, region, path):
+        with self.state.lock:
+            self.state.counts[f"{self.command} /{region or 'global'}{path}"] += 1
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"null")
+
+    def _post_entries(self, entries):
+        state = self.state
+        if state.ns_down:
+            return self._send(503, {"status": 503, "message": "simulated outage"})
+        if state.ns_secret and self.headers.get("api-secret") != state.ns_secret:
+            return self._send(401, {"status": 401, "message": "Unauthorized"})
+        with state.lock:
+            for entry in entries:
+                key = (entry.get("type"), entry.get("date"))
+                if key in state.entries:
+                    state.counts["nightscout duplicates"] += 1
+                state.entries[key] = entry
+            state.counts["nightscout entries"] = len(state.entries)
+        return self._send(200, entries)
+
+    def do_POST(self):
+        region, path = self._split()
+        # Always consume the body so the kept-alive connection stays in sync
+        body = self._body()
+        if path == "/_outage":
+            self.state.ns_down = bool(body.get("nightscout"))
+            return self._send(200, {"nightscout_down": self.state.ns_down})
+        self._count(region, path)
+        if path == "/api/v1/entries":
+            return self._post_entries(body)
+        if path != "/llu/auth/login":
+            return self._send(404, {"status": 404})
+        state = self.state
+        if _version(self.headers.get("version")) < _version(state.min_version):
+            return self._send(403, {"status": 920, "data": {"minimumVersion": state.min_version}})
+        if region != state.region:
+            return self._send(200, {"status": 0, "data": {"redirect": True, "region": state.region}})
+        body = body or {}
+        if body.get("email") != state.email or body.get("password") != state.password:
+            return self._send(200, {"status": 2, "error": {"message": "notAuthenticated"}})
+        return self._send(200, {"status": 0, "data": {
+            "user": {"id": "stub-user"},
+            "authTicket": {"token": TOKEN, "expires": int(time.time()) + 3600, "duration": 3600000},
+        }})
+
+    def do_GET(self):
+        region, path = self._split()
+        if path == "/_stats":
+            with self.state.lock:
+                return self._send(200, dict(self.state.counts))
+        self._count(region, path)
+        if region != self.state.region:
+            return self._send(404, {"status": 404})
+        if self.headers.get("authorization") != f"Bearer {TOKEN}":
+            return self._send(401, {"status": 401})
+
+        now = time.time() // 60 * 60
+        if path == "/llu/connections":
+            return self._send(200, {"status": 0, "data": [{"patientId": PATIENT_ID, "firstName": "Stub"}]})
+        if path == f"/llu/connections/{PATIENT_ID}/graph":
+            points = [_point(now - i * 300) for i in range(144, 0, -1)]
+            return self._send(200, {"status": 0, "data": {
+                "connection": {"glucoseMeasurement": _point(now)},
+                "graphData": points,
+            }})
+        if path == f"/llu/connections/{PATIENT_ID}/logbook":
+            # Newest first, like the real service
+            return self._send(200, {"status": 0, "data": [_point(now - i * 900) for i in range(1, 14 * 96)]})
+        return self._send(404, {"status": 404})
+
+    def log_message(self, fmt, *args):
+        print(f"{self.address_string()} {fmt % args}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the LibreLinkUp API.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--region", default="eu", help="region owning the account ('' for global)")
+    parser.add_argument("--min-version", default="4.16.0")
+    parser.add_argument("--email", default="user@example.com")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--ns-secret", default="", help="Nightscout API secret required for uploads")
+    args = parser.parse_args(argv)
+
+    StubHandler.state = StubState(args)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"Stub LibreLinkUp API on http://127.0.0.1:{args.port} (account region: {args.region or 'global'})",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+import time
+
+# Keep this module's imports to the stdlib: with the `spawn` start method the
+# tray child imports it on startup, and PIL/pystray are loaded lazily below.
+
+
+def tray_process_func(glucose_queue, command_queue, shutdown_event):
+    """
+    Function to run the tray icon in a separate process.
+    This keeps the macOS Cocoa loop isolated from the Tkinter process.
+    """
+    print(f"Tray process started (PID: {os.getpid()})")
+    # Imported here rather than at module level: the parent only needs a
+    # reference to this function, and the child should load nothing else.
+    from PIL import Image, ImageDraw, ImageFont
+    import pystray
+    
+    # On macOS, hide the Dock icon for this process to make it feel like one app
+    if sys.platform == "darwin":
+        try:
+            from AppKit import NSApplication, NSApplicationActivationPolicyProhibited, NSApplicationActivationPolicyAccessory
+            ns_app = NSApplication.sharedApplication()
+            # Policy 2 (Prohibited) hides from Dock and Menu Bar but pystray handles Menu Bar
+            # let's try 1 (Accessory) which is for background apps with menu bars
+            ns_app.setActivationPolicy_(NSApplicationActivationPolicyAccessory)
+        except Exception as e:
+            print(f"Failed to hide tray Dock icon: {e}")
+            
+    current_val = "--"
+    current_color = "#2ecc71" # Default green
+    
+    # Try to load a project icon (icon.png) to use as tray icon if available
+    proj_root = os.path.abspath(os.path.dirname(__file__))
+    icon_png_path = os.path.join(proj_root, 'icon.png')
+    _tray_base_icon = None
+    if os.path.exists(icon_png_path):
+        try:
+            _tray_base_icon = Image.open(icon_png_path).convert('RGBA').resize((64, 64))
+        except:
+            _tray_base_icon = None
+
+    def create_image(text, bg_color):
+        # Create a circular colored tray icon and render the glucose value.
+        # Titlebar/icon of the main window is set elsewhere and will not change.
+        size = (64, 64)
+        img = Image.new('RGBA', size, (0, 0, 0, 0))
+        dc = ImageDraw.Draw(img)
+
+        # Draw circle background
+        try:
+            radius = min(size) // 2 - 4
+            center = (size[0] // 2, size[1] // 2)
+            bbox = [center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius]
+            dc.ellipse(bbox, fill=bg_color)
+        except Exception:
+            dc.rectangle([0, 0, size[0], size[1]], fill=bg_color)
+
+        # Draw value text centered
+        try:
+            txt = str(text)
+            # basic font sizing heuristic
+            font_size = 28 if len(txt) <= 2 else 20
+            try:
+                font = ImageFont.truetype("arial.ttf", font_size)
+            except Exception:
+                try:
+                    font = ImageFont.load_default()
+                except Exception:
+                    font = None
+
+            if hasattr(dc, "textbbox"):
+                left, top, right, bottom = dc.textbbox((0, 0), txt, font=font)
+                w, h = right - left, bottom - top
+            else:
+                w, h = dc.textsize(txt, font=font)
+            text_pos = (center[0] - w // 2, center[1] - h // 2)
+            dc.text(text_pos, txt, fill=(255, 255, 255), font=font)
+        except Exception:
+            pass
+
+        return img
+
+    def on_show(icon, item):
+        command_queue.put("SHOW")
+
+    def on_snooze(icon, item):
+        command_queue.put("SNOOZE")
+
+    def on_quit(icon, item):
+        icon.stop()
+        command_queue.put("QUIT")
+        shutdown_event.set()
+
+    def update_loop(icon):
+        nonlocal current_val, current_color
+        icon.visible = True
+        while not shutdown_event.is_set():
+            updated = False
+            while not glucose_queue.empty():
+                item = glucose_queue.get()
+                if isinstance(item, tuple):
+                    val, color_idx = item
+                    # format numeric value
+                    try:
+                        if val is None:
+                            current_val = None
+                        else:
+                            current_val = int(round(float(val)))
+                    except Exception:
+                        current_val = str(val)
+
+                    if color_idx == 2:
+                        current_color = "#f1c40f"
+                    elif color_idx == 3:
+                        current_color = "#e74c3c"
+                    else:
+                        current_color = "#2ecc71"
+                else:
+                    # unknown payload
+                    try:
+                        current_val = int(round(float(item)))
+                    except Exception:
+                        current_val = None
+                    current_color = "#2b2b2b"
+
+                updated = True
+
+            # Always refresh the tray icon so it's kept in sync
+            display_val = current_val if current_val is not None else "--"
+            icon.title = f"LibreView: {display_val} mg/dL"
+            try:
+                icon.icon = create_image(display_val, current_color)
+            except Exception:
+                pass
+            time.sleep(1)
+
+    menu = pystray.Menu(
+        pystray.MenuItem("Show Monitor", on_show),
+        pystray.MenuItem("Snooze Alerts (1h)", on_snooze),
+        pystray.Menu.SEPARATOR,
+        pystray.MenuItem("Quit", on_quit)
+    )
+    
+    icon = pystray.Icon("LibreView", create_image("--", "#2b2b2b"), "LibreView", menu)
+    
+    threading.Thread(target=update_loop, args=(icon,), daemon=True).start()
+    icon.run()
+    
+    # Ensure main process knows we're quitting
+    command_queue.put("QUIT")
+    print("Tray process ending")
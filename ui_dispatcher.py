@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class UIDispatcher:
+    """
+    Hands UI updates from worker threads to the Tk thread.
+
+    Workers `post(key, fn)` instead of calling `after` themselves (Tk is not
+    thread-safe). Posts are keyed per widget and only the newest one per key
+    survives until the next drain, so a burst of refreshes costs one frame.
+    The Tk thread drains every `interval_ms` from its own after() loop, which
+    bounds the UI update rate no matter how fast workers post.
+    """
+
+    def __init__(self, root, interval_ms: int = 100):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[Hashable, Callable[[], None]]" = OrderedDict()
+        self._after_id = None
+        self._running = False
+        self.coalesced = 0
+
+    def start(self) -> None:
+        """Start draining; call from the Tk thread."""
+        if not self._running:
+            self._running = True
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self) -> None:
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        with self._lock:
+            self._pending.clear()
+
+    def post(self, key: Hashable, fn: Callable[[], None]) -> None:
+        """Schedule `fn` on the Tk thread, replacing any not-yet-applied update with the same key."""
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            # Keep the key's original position so updates apply in first-posted order
+            self._pending[key] = fn
+
+    def _drain(self) -> None:
+        with self._lock:
+            updates = list(self._pending.values())
+            self._pending.clear()
+        for fn in updates:
+            try:
+                fn()
+            except Exception as e:
+                print(f"UI update failed: {e}")
+            if not self._running:
+                # An update shut the app down
+                return
+        self._after_id = self.root.after(self.interval_ms, self._drain)
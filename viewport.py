@@ -0,0 +1,127 @@
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional, Set, Tuple
+
+import numpy as np
+
+from glucose_data import GraphColumns, empty_columns
+from history import HistoryStore
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_USER, TaskScheduler
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Visible spans the graph zooms through, narrowest first
+ZOOM_LEVELS = (3 * HOUR, 6 * HOUR, 12 * HOUR, DAY, 3 * DAY, 7 * DAY, 14 * DAY, 30 * DAY, 90 * DAY)
+
+TileKey = Tuple[int, int]  # (span, index): covers [index * span, (index + 1) * span)
+
+
+class HistoryViewport:
+    """
+    Serves the part of the history that is on screen while the graph is
+    panned or zoomed.
+
+    The timeline is cut into tiles one visible span wide, aligned to multiples
+    of the span, so any view touches at most two tiles of its zoom level.
+    Each tile is queried once at `resolution` points (bucket means for wide
+    spans) and kept in a bounded LRU. Tiles on screen are fetched at user
+    priority; the tiles either side are prefetched at background priority so
+    a drag finds them cached. `on_ready` is called from a worker thread when a
+    tile the last view asked for arrives.
+    """
+    RESOLUTION = 400
+    CACHE_SIZE = 48
+
+    def __init__(self, history: HistoryStore, scheduler: TaskScheduler,
+                 on_ready: Optional[Callable[[], None]] = None,
+                 resolution: int = RESOLUTION, cache_size: int = CACHE_SIZE):
+        self.history = history
+        self.scheduler = scheduler
+        self.on_ready = on_ready
+        self.resolution = resolution
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._tiles: "OrderedDict[TileKey, GraphColumns]" = OrderedDict()
+        self._loading: Set[TileKey] = set()
+        self._wanted: Set[TileKey] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, start: float, span: int) -> Tuple[GraphColumns, bool]:
+        """
+        Readings in [start, start + span] from cached tiles, and whether the
+        view was complete. Missing tiles are queued and reported via on_ready.
+        """
+        first = int(start // span)
+        last = int((start + span) // span)
+        visible = [(span, i) for i in range(first, last + 1)]
+        parts = []
+        with self._lock:
+            self._wanted = set(visible)
+            for key in visible:
+                tile = self._tiles.get(key)
+                if tile is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._tiles.move_to_end(key)
+                    parts.append(tile)
+        complete = len(parts) == len(visible)
+        for key in visible:
+            self._request(key, PRIORITY_USER)
+        for key in ((span, first - 1), (span, last + 1)):
+            self._request(key, PRIORITY_BACKGROUND)
+        return self._slice(parts, start, start + span), complete
+
+    def invalidate(self, since: float) -> None:
+        """Drop tiles reaching past `since`, e.g. after new readings were stored."""
+        with self._lock:
+            for key in [k for k in self._tiles if (k[1] + 1) * k[0] > since]:
+                del self._tiles[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self._wanted.clear()
+
+    def _request(self, key: TileKey, priority: int) -> None:
+        with self._lock:
+            if key in self._tiles or key in self._loading:
+                return
+            self._loading.add(key)
+        self.scheduler.submit(self._load, key, priority=priority, name="viewport")
+
+    def _load(self, key: TileKey) -> None:
+        span, index = key
+        try:
+            tile = self.history.query_window(index * span, (index + 1) * span, self.resolution)
+        except Exception as e:
+            print(f"Error loading history window: {e}")
+            with self._lock:
+                self._loading.discard(key)
+            return
+        with self._lock:
+            self._loading.discard(key)
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+            wanted = key in self._wanted
+        if wanted and self.on_ready:
+            self.on_ready()
+
+    @staticmethod
+    def _slice(parts, start: float, end: float) -> GraphColumns:
+        """Join adjacent tiles and keep [start, end] plus one reading either side, so lines reach the edges."""
+        if not parts:
+            return empty_columns()
+        times = np.concatenate([np.frombuffer(p.times, dtype=np.float64) for p in parts])
+        values = np.concatenate([np.frombuffer(p.values, dtype=np.float32) for p in parts])
+        flags = np.concatenate([np.frombuffer(p.flags, dtype=np.uint8) for p in parts])
+        order = np.argsort(times, kind="stable")
+        times, values, flags = times[order], values[order], flags[order]
+        lo = max(0, int(np.searchsorted(times, start, side="left")) - 1)
+        hi = min(len(times), int(np.searchsorted(times, end, side="right")) + 1)
+        return GraphColumns(array('d', times[lo:hi].tobytes()), array('f', values[lo:hi].tobytes()),
+                            array('B', flags[lo:hi].tobytes()))